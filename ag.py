@@ -1,10 +1,83 @@
-from labirinto import Labirinto
+from labirinto import Labirinto, LabirintoSet, FORA
 from individuo import Individuo
-import random
+from populacao import Populacao
+from paralelo import AvaliadorParalelo
+from avaliacao import Checkpoint, MOTORES
+from registro import Registro, RegistroTexto, RegistroNulo
+from observador import Metricas
+from estado import salva_estado, carrega_estado
+from genoma import empacota, desempacota
+from cache import CacheAvaliacao
+from parada import CriterioParada
+from amostrador import Amostrador
+from selecao import SELECOES, k_melhores, k_piores, torneio, ranking, sus, pesos_aptidao
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import itertools
+import heapq
+import hashlib
+import json
+import time
+import os
+
+# parametros que mudam a evolucao e precisam ser iguais para retomar uma execucao salva (alem das configuracoes
+# do amostrador e do criterio de parada, ver AlgoritmoGenetico._parametros_estado)
+HIPERPARAMETROS = ('pop_size', 'n_elites', 'reposition', 'reposition_n', 'taxa_mutacao', 'smart_first_gen', 'selecao', 'tamanho_torneio',
+                   'modo', 'n_filhos', 'mutacao', 'aptidao')
+
+# modos de AlgoritmoGenetico.gera_nova_pop
+MODOS = ('geracional', 'estacionario')
+
+# operadores de mutacao e funcoes de aptidao (as guiadas usam os campos de Labirinto.distancias_comidas)
+MUTACOES = ('aleatoria', 'guiada')
+APTIDOES = ('original', 'moldada')
+
+# pontos da aptidao moldada por passo a menos ate a comida restante mais proxima
+PESO_DISTANCIA = 2
+
+# fases da execucao cronometradas em AlgoritmoGenetico.tempos
+FASES = ('primeira_geracao', 'elitismo', 'torneio', 'crossover', 'mutacao', 'avaliacao', 'substituicao', 'registro', 'busca')
+
+
+def _parado(*args) -> float:
+    """Relogio usado quando as fases nao sao cronometradas."""
+    return 0.0
+
+
+def _area(areas: dict, nome: str, forma: tuple, tipo) -> np.ndarray:
+    """Retorna o vetor de trabalho nome de areas, reaproveitado entre geracoes: so eh alocado (sem inicializar)
+       quando ainda nao existe ou a forma muda."""
+    area = areas.get(nome)
+    if area is None or area.shape != forma or area.dtype != tipo:
+        area = areas[nome] = np.empty(forma, dtype=tipo)
+
+    return area
+
+
+def _comida_mais_proxima(lab: Labirinto, casas: np.ndarray, visitados: np.ndarray) -> tuple:
+    """Para cada individuo parado em casas, com as casas visitadas em bits (como Populacao.visitados), acha a
+       comida ainda nao comida mais proxima pelos campos de Labirinto.distancias_comidas.
+
+    Returns:
+        tuple: Distancia ate essa comida (lab.caminho.size se nenhuma comida restante eh alcancavel) e o indice
+            dela nos campos.
+    """
+    distancias = lab.distancias_comidas()
+    n_casas = lab.caminho.size
+    if len(distancias) == 0:
+        return np.full(len(casas), n_casas, dtype=np.int32), np.zeros(len(casas), dtype=np.intp)
+
+    comidas = lab.casas_comidas
+    comidas_visitadas = (visitados[:, comidas >> 3] >> (7 - (comidas & 7))) & 1
+    distancia = np.where(comidas_visitadas == 1, n_casas, distancias[:, casas].T)
+    alvo = distancia.argmin(axis=1)
+
+    return distancia[np.arange(len(casas)), alvo], alvo
+
 
 class AlgoritmoGenetico:
     
-    def __init__(self, max_geracoes: int = 1000, pop_size: int = 100, n_elites: int = 1, reposition: bool = False, reposition_n: int = 1, taxa_mutacao: float = 0.01, smart_first_gen: bool = True) -> None:
+    def __init__(self, max_geracoes: int = 1000, pop_size: int = 100, n_elites: int = 1, reposition: bool = False, reposition_n: int = 1, taxa_mutacao: float = 0.01, smart_first_gen: bool = True, n_jobs: int = 1, registro: Registro = None, seed: int = None, observadores: list = None, cronometra: bool = True, arquivo_estado: str = None, intervalo_estado: int = 100, memoria_cache: int = 64 << 20, motor: str = 'lote', parada: CriterioParada = None, amostrador: Amostrador = None, selecao: str = 'torneio', tamanho_torneio: int = 2, modo: str = 'geracional', n_filhos: int = 2, mutacao: str = 'aleatoria', aptidao: str = 'original') -> None:
         """Inicializa o objeto algoritmo genetico. 
 
         Args:
@@ -13,8 +86,25 @@ class AlgoritmoGenetico:
             n_elites (int, optional): Quantidade de individuos que serao escolhidos no elitismo. Defaults to 1.
             reposition (bool, optional): Se o elitismo usa reposicao (faz mais de uma copia de cada individuo). Defaults to False.
             reposition_n (int, optional): Quantidade de copias de cada individuo quando ha reposicao no elitismo. Defaults to 1.
-            taxa_mutacao (float, optional): Taxa de mutacao (% de individuos mutados). Defaults to 0.01.
+            taxa_mutacao (float, optional): Probabilidade de cada gene do filho mutado de cada par ser sorteado de novo. Defaults to 0.01.
             smart_first_gen (bool, optional): Inicializa a primeira populacao de forma inteligente (somente individuos com posicao != 0). Defaults to True.
+            n_jobs (int, optional): Quantidade de processos usados para avaliar cada populacao. Com 1, avalia no proprio processo (o modo estacionario sempre avalia no proprio processo). Defaults to 1.
+            registro (Registro, optional): Onde o log da execucao eh escrito (texto, resumo ou binario). Defaults to RegistroTexto('saida.txt').
+            seed (int | np.random.SeedSequence, optional): Semente do gerador aleatorio usado por todos os operadores. Defaults to None.
+            observadores (list, optional): Observadores (ver o modulo 'observador') chamados a cada geracao de fit. Defaults to None.
+            cronometra (bool, optional): Se soma o tempo de cada fase em tempos. Desligado, nao custa nada. Defaults to True.
+            arquivo_estado (str, optional): Arquivo onde o estado da execucao eh salvo, para ser retomado com fit(lab, resume_from=...). Defaults to None.
+            intervalo_estado (int, optional): Quantidade de geracoes entre dois salvamentos do estado. Defaults to 100.
+            memoria_cache (int, optional): Memoria (bytes) do cache com a avaliacao dos genomas ja vistos. 0 desliga o cache. Defaults to 64 MB.
+            motor (str, optional): Motor de avaliacao das populacoes: 'lote' (todos os individuos a cada passo) ou 'compacto' (so os que ainda andam, de k em k passos). Defaults to 'lote'.
+            parada (CriterioParada, optional): Criterio que para (ou reinicia) a execucao quando a populacao estagna, alem da convergencia. Defaults to None.
+            amostrador (Amostrador, optional): Sorteia os genomas da primeira geracao e dos reinicios (ver o modulo 'amostrador'). Defaults to Amostrador().
+            selecao (str, optional): Selecao dos pais (ver o modulo 'selecao'): 'torneio', 'ranking' (ranking linear) ou 'sus' (proporcional a pontuacao). Defaults to 'torneio'.
+            tamanho_torneio (int, optional): Quantidade de participantes de cada torneio. Defaults to 2.
+            modo (str, optional): 'geracional' (cada geracao troca a populacao toda) ou 'estacionario' (cada geracao gera e avalia so n_filhos filhos, que substituem os piores). Defaults to 'geracional'.
+            n_filhos (int, optional): Quantidade de filhos de cada passo do modo estacionario. Defaults to 2.
+            mutacao (str, optional): 'aleatoria' ou 'guiada' (metade dos filhos mutados, em vez de genes aleatorios, continua o prefixo herdado por um caminho minimo ate a comida mais proxima, ver _mutacao_guiada). Defaults to 'aleatoria'.
+            aptidao (str, optional): 'original' ou 'moldada' (soma PESO_DISTANCIA pontos por passo a menos entre o fim da exploracao e a comida restante mais proxima, ver _molda). Defaults to 'original'.
         """        
         self.solucao = None
         self.geracoes = 0
@@ -25,81 +115,246 @@ class AlgoritmoGenetico:
         self.reposition_n = reposition_n
         self.taxa_mutacao = taxa_mutacao
         self.smart_first_gen = smart_first_gen
+        self.n_jobs = n_jobs
+        self.registro = registro if registro is not None else RegistroTexto('saida.txt')
+        self._avaliador = None
+
+        # buffer duplo das geracoes: a populacao anterior vira a reserva onde a geracao seguinte eh escrita
+        self._reserva = None
+        # vetores de trabalho dos operadores, reaproveitados entre geracoes (ver _area)
+        self._areas = {}
+
+        self.observadores = list(observadores) if observadores is not None else []
+        self.arquivo_estado = arquivo_estado
+        self.intervalo_estado = intervalo_estado
+        self.cache = CacheAvaliacao(memoria_cache) if memoria_cache > 0 else None
+        if motor not in MOTORES:
+            raise ValueError(f'Motor de avaliacao desconhecido: {motor}')
+        self.motor = motor
+        self.parada = parada
+        self.amostrador = amostrador if amostrador is not None else Amostrador()
+        if selecao not in SELECOES:
+            raise ValueError(f'Selecao desconhecida: {selecao}')
+        self.selecao = selecao
+        self.tamanho_torneio = tamanho_torneio
+        if modo not in MODOS:
+            raise ValueError(f'Modo desconhecido: {modo}')
+        self.modo = modo
+        self.n_filhos = n_filhos
+        if mutacao not in MUTACOES:
+            raise ValueError(f'Mutacao desconhecida: {mutacao}')
+        self.mutacao = mutacao
+        if aptidao not in APTIDOES:
+            raise ValueError(f'Aptidao desconhecida: {aptidao}')
+        self.aptidao = aptidao
+
+        # quantidade de genomas avaliados (sem contar os que o cache ou o elitismo dispensam)
+        self.avaliacoes = 0
+        # heap (pontuacao, indice, versao) com os piores individuos do modo estacionario
+        self._heap = []
+        self._heap_pop = None
+        self._alteracoes_heap = None
+        self._versoes = []
+
+        # por que a ultima execucao de fit terminou: 'solucao', 'convergencia', 'estagnacao' ou 'max_geracoes'
+        self.motivo_parada = None
+
+        # tempo total (s) gasto em cada fase da execucao, somado ao longo das geracoes
+        self.tempos = dict.fromkeys(FASES, 0.0)
+        if not cronometra:
+            self._relogio = self._cronometra = _parado
+
+        # gerador aleatorio de toda a execucao; a SeedSequence gera sementes independentes para outros processos
+        self._semente = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self._semente)
+
+
+    def gera_sementes(self, n: int) -> list:
+        """Gera n sementes filhas independentes da semente da execucao, para geradores de outros processos."""
+        return self._semente.spawn(n)
+
+
+    # instante atual (s) usado para cronometrar as fases
+    _relogio = staticmethod(time.perf_counter)
+
+
+    def _cronometra(self, fase: str, inicio: float) -> float:
+        """Soma ao tempo da fase o tempo desde inicio e retorna o instante atual, que eh o inicio da proxima fase."""
+        agora = self._relogio()
+        self.tempos[fase] += agora - inicio
+
+        return agora
 
     
-    def gera_primeira_pop(self, n: int, lab: Labirinto) -> list:
-        """Gera a primeira posicao de n individuos.
+    def gera_primeira_pop(self, n: int, lab: Labirinto) -> Populacao:
+        """Gera a primeira posicao de n individuos, sorteados e avaliados em lote pelo amostrador (com
+           smart_first_gen, so ficam individuos com pontuacao > 0).
 
         Args:
             n (int): Quantidade de individuos na primeira populacao.
-            lab (Labirinto): Labirinto que os individuos irao explorar.
+            lab (Labirinto | LabirintoSet): Labirinto (ou conjunto de labirintos) que os individuos irao explorar.
 
         Returns:
-            list: Lista com individuos: populacao.
+            Populacao: Populacao com os individuos.
         """        
-        pop = []
-
-        while len(pop) < n:
-            a = Individuo()
-            a.gera_movimentos(lab.caminho.shape[0]**2*3)
-            a.explora(lab)
-            if self.smart_first_gen == True:
-                if a.pontuacao > 0:
-                    pop.append(a)
-            else:
-                pop.append(a)
+        inicio = self._relogio()
+        pop = Populacao(n, lab.tamanho_genoma)
+        tentativas = self.amostrador.tentativas
+        if not self.amostrador.sorteia(pop, lab, self.rng, self.smart_first_gen, self.motor):
+            self._avalia(pop, lab)
+            self.avaliacoes += n
+        self.avaliacoes += self.amostrador.tentativas - tentativas
+        self._molda(pop, lab)
 
+        self._cronometra('primeira_geracao', inicio)
         self.geracoes += 1
 
         return pop
 
 
-    def gera_nova_pop(self, pop_anterior: list, lab: Labirinto) -> list:
+    def _reinicia(self, pop: Populacao, lab: Labirinto) -> None:
+        """Troca os piores individuos da populacao (fracao_reinicio do criterio de parada) por individuos novos."""
+        n = max(1, int(len(pop)*self.parada.fracao_reinicio))
+        piores = k_piores(pop.pontuacao, n)
+        novos = Populacao(n, pop.n_genes)
+        # avalia no proprio processo: o grupo de processos so avalia populacoes inteiras
+        tentativas = self.amostrador.tentativas
+        if not self.amostrador.sorteia(novos, lab, self.rng, self.smart_first_gen, self.motor):
+            novos.avalia(lab, motor=self.motor)
+            self.avaliacoes += n
+        self.avaliacoes += self.amostrador.tentativas - tentativas
+        self._molda(novos, lab)
+        pop.substitui(piores, novos)
+
+
+    def _proxima_pop(self, pop_anterior: Populacao) -> Populacao:
+        """Retorna a populacao onde a proxima geracao eh escrita (buffer duplo): a reserva, que eh a populacao
+           anterior a pop_anterior, ou uma nova se ainda nao houver uma do mesmo tamanho. pop_anterior passa a
+           ser a reserva da geracao seguinte."""
+        nova_pop = self._reserva
+        if nova_pop is None or nova_pop is pop_anterior or nova_pop.genomas.shape != pop_anterior.genomas.shape:
+            nova_pop = Populacao(len(pop_anterior), pop_anterior.n_genes)
+        self._reserva = pop_anterior
+
+        return nova_pop
+
+
+    def _gera_filhos(self, pop: Populacao, lab: Labirinto, n_pares: int, inicio: float) -> tuple:
+        """Seleciona os pais de n_pares pares, gera dois filhos de cada par por crossover e muta um dos dois.
+
+        Returns:
+            tuple: Genomas dos filhos, indice de quem cada filho herda os movimentos corretos, gene de onde cada
+                filho continua a exploracao e o instante do fim (para cronometrar a fase seguinte).
+        """
+        # seleciona os pais de cada par de filhos
+        pais, maes = self._seleciona_pais(pop, n_pares)
+        inicio = self._cronometra('torneio', inicio)
+
+        # gera dois filhos por crossover, que herdam os movimentos corretos de quem vem primeiro
+        filhos = _area(self._areas, 'filhos', (2*n_pares, pop.n_genes), pop.genomas.dtype)
+        self._crossover(pop, pais, maes, filhos, self._areas)
+        herdam = _area(self._areas, 'herdam', (2*n_pares,), np.intp)
+        herdam[0::2] = pais
+        herdam[1::2] = maes
+        passo_filhos = pop.n_corretos[herdam]
+        inicio = self._cronometra('crossover', inicio)
+
+        # muta um dos dois filhos de cada par, no proprio vetor dos filhos
+        mutados = 2*np.arange(n_pares) + self.rng.integers(0, 2, n_pares)
+        if self.mutacao == 'guiada':
+            # na mutacao guiada, metade dos mutados (sorteada) segue do prefixo herdado ate a comida mais proxima
+            # em vez de sortear genes, entao o prefixo continua valido
+            guia = self.rng.random(n_pares) < 0.5
+            guiados, mutados = mutados[guia], mutados[~guia]
+            origem = herdam[guiados]
+            self._mutacao_guiada(filhos, guiados, pop.posicao[origem], passo_filhos[guiados], pop.visitados[origem], lab, self.rng)
+        sorteados = self._mutacao(filhos, self.taxa_mutacao, self.rng, mutados, self._areas)
+
+        # se a mutacao mexeu nos movimentos herdados (o primeiro gene sorteado vem antes do passo), o filho eh avaliado do inicio
+        primeiro = sorteados.argmax(axis=1)
+        mexeu = sorteados[np.arange(len(mutados)), primeiro] & (primeiro < passo_filhos[mutados])
+        passo_filhos[mutados[mexeu]] = 0
+
+        return filhos, herdam, passo_filhos, inicio
+
+
+    def gera_nova_pop(self, pop_anterior: Populacao, lab: Labirinto) -> Populacao:
         """A partir de uma populacao, aplica os metodos elitismo, torneio, crossover e mutacao para gerar
            uma nova populacao. 
 
+           A nova populacao eh escrita sobre a populacao recebida na chamada anterior (buffer duplo), entao so
+           a populacao retornada e pop_anterior continuam validas depois da chamada. Para guardar uma populacao
+           (ou um Individuo dela) por mais tempo, copie-a com pop.seleciona.
+
         Args:
-            pop_anterior (list): Lista com individuos que representa a popoulacao anterior.
+            pop_anterior (Populacao): Populacao anterior.
             lab (Labirinto): Labirinto da nova popoulacao. 
 
+           No modo 'estacionario', so n_filhos filhos sao gerados e avaliados e substituem os piores individuos
+           da propria pop_anterior, que eh retornada (ver _passo_estacionario).
+
         Returns:
-            list: Lista com novos individuos descendentes da populacao anterior.
+            Populacao: Novos individuos descendentes da populacao anterior.
         """        
-        nova_pop = []
+        if self.modo == 'estacionario':
+            return self._passo_estacionario(pop_anterior, lab)
 
-        # faz elitismo
-        elites = self._elitismo(pop_anterior, self.n_elites, self.reposition, self.reposition_n)
+        inicio = self._relogio()
+        n = len(pop_anterior)
+        nova_pop = self._proxima_pop(pop_anterior)
 
-        # muta os elites
-        for ind in elites:
-            self._mutacao_elite(ind, lab)
-            if len(nova_pop) < len(pop_anterior):
-                nova_pop.append(ind)
+        # gene de onde cada individuo da nova pop continua a exploracao (0 = do inicio) e de quem herda o estado
+        passo = _area(self._areas, 'passo', (n,), np.int32)
+        origem = _area(self._areas, 'origem', (n,), np.intp)
 
-        while len(nova_pop) < len(pop_anterior):
-            # faz torneio
-            pai = self._torneio(pop_anterior)
-            mae = self._torneio(pop_anterior)
+        # faz elitismo
+        elites = self._elitismo(pop_anterior, self.n_elites, self.reposition, self.reposition_n)[:n]
+        n_elites = len(elites)
+        np.take(pop_anterior.genomas, elites, axis=0, out=nova_pop.genomas[:n_elites], mode='clip')
+        origem[:n_elites] = elites
 
-            # gera dois filhos por crossover
-            filho1, filho2 = self._crossover(pai, mae)
+        # muta os elites (somente as copias feitas pela reposicao partem dos movimentos corretos)
+        if self.reposition:
+            self._mutacao_elite(nova_pop.genomas[:n_elites], pop_anterior.corretos[elites], pop_anterior.n_corretos[elites], self.rng)
+            passo[:n_elites] = pop_anterior.n_corretos[elites]
+        else:
+            # o genoma nao mudou, entao a avaliacao eh a mesma
+            passo[:n_elites] = nova_pop.n_genes
+        inicio = self._cronometra('elitismo', inicio)
 
-            # muta um dos dois filhos 
-            if random.randint(1, 2) == 1:
-                self._mutacao(filho1, 0.01)
-            else:
-                self._mutacao(filho2, 0.01)
+        # seleciona os pais, faz crossover e muta os filhos
+        filhos, herdam, passo_filhos, inicio = self._gera_filhos(pop_anterior, lab, (n - n_elites + 1) // 2, inicio)
 
-            # coloca os filhos mutados na pop
-            if len(nova_pop) < len(pop_anterior):
-                nova_pop.append(filho1)
+        # coloca os filhos mutados na pop
+        nova_pop.genomas[n_elites:] = filhos[:n - n_elites]
+        passo[n_elites:] = passo_filhos[:n - n_elites]
+        origem[n_elites:] = herdam[:n - n_elites]
+        inicio = self._cronometra('mutacao', inicio)
 
-            if len(nova_pop) < len(pop_anterior):
-                nova_pop.append(filho2)
+        # genomas ja avaliados (no cache ou repetidos na nova pop) nao andam
+        if self.cache is not None:
+            chaves = self.cache.chaves(nova_pop.genomas)
+            achadas, resultados, repetidas, primeiras = self.cache.consulta(chaves)
+            passo[achadas] = nova_pop.n_genes
+            passo[repetidas] = nova_pop.n_genes
 
-        # recalcula a aptidao de cada individuo na nova pop
-        for ind in nova_pop:
-            ind.explora(lab)
+        # recalcula a aptidao de todos os individuos da nova pop de uma vez, continuando dos checkpoints
+        checkpoint = pop_anterior.checkpoint(origem)
+        checkpoint.passo = passo
+        self.avaliacoes += int(np.count_nonzero(passo < nova_pop.n_genes))
+        self._avalia(nova_pop, lab, checkpoint)
+        self._molda(nova_pop, lab)
+        if not self.reposition:
+            nova_pop.copia_avaliacao(np.arange(n_elites), pop_anterior, elites)
+
+        # completa os genomas ja avaliados e guarda os novos no cache
+        if self.cache is not None:
+            self.cache.restaura(nova_pop, achadas, resultados)
+            nova_pop.copia_avaliacao(repetidas, nova_pop, primeiras)
+            novas = np.ones(n, dtype=bool)
+            novas[achadas] = novas[repetidas] = False
+            self.cache.guarda(nova_pop, chaves, np.flatnonzero(novas))
+        self._cronometra('avaliacao', inicio)
 
         # soma 1 nas geracoes
         self.geracoes += 1
@@ -107,218 +362,763 @@ class AlgoritmoGenetico:
         return nova_pop
 
 
-    def fit(self, lab: Labirinto) -> None:
+    def _passo_estacionario(self, pop: Populacao, lab: Labirinto) -> Populacao:
+        """Um passo do modo estacionario: gera n_filhos filhos com os mesmos operadores do modo geracional,
+           avalia so eles (continuando dos checkpoints dos pais) e coloca cada um no lugar de um dos piores
+           individuos da populacao, achados em um heap ordenado pela pontuacao. A populacao eh alterada no
+           proprio lugar e retornada; o passo conta como uma geracao.
+
+        Args:
+            pop (Populacao): Populacao atual.
+            lab (Labirinto): Labirinto da populacao.
+
+        Returns:
+            Populacao: A propria populacao, com os filhos no lugar dos piores.
+        """
+        inicio = self._relogio()
+        n_filhos = min(self.n_filhos, len(pop))
+        filhos, herdam, passo, inicio = self._gera_filhos(pop, lab, (n_filhos + 1) // 2, inicio)
+        inicio = self._cronometra('mutacao', inicio)
+
+        # avalia so os filhos, no proprio processo (o grupo de processos avalia populacoes inteiras)
+        novos = Populacao(n_filhos, pop.n_genes)
+        novos.genomas[:] = filhos[:n_filhos]
+        checkpoint = pop.checkpoint(herdam[:n_filhos])
+        checkpoint.passo = passo[:n_filhos]
+        novos.avalia(lab, checkpoint, self.motor)
+        self._molda(novos, lab)
+        self.avaliacoes += n_filhos
+        inicio = self._cronometra('avaliacao', inicio)
+
+        # os filhos substituem os piores e entram no heap com a pontuacao nova
+        piores = self._piores_heap(pop, n_filhos)
+        pop.substitui(piores, novos)
+        for i in piores.tolist():
+            self._versoes[i] += 1
+            heapq.heappush(self._heap, (int(pop.pontuacao[i]), i, self._versoes[i]))
+        self._alteracoes_heap = pop.alteracoes
+        self._cronometra('substituicao', inicio)
+
+        self.geracoes += 1
+
+        return pop
+
+
+    def _piores_heap(self, pop: Populacao, n: int) -> np.ndarray:
+        """Tira do heap os n piores individuos da populacao (menor pontuacao; nos empates, menor indice). Cada
+           linha tem uma versao, que muda quando ela eh substituida, e entradas de versoes antigas sao
+           descartadas ao sair do heap. O heap eh refeito quando a populacao mudou fora dos passos (outra
+           populacao, ou Populacao.alteracoes diferente do fim do ultimo passo: reinicio, migracao) ou acumulou
+           entradas antigas demais. Assim cada passo custa O(n_filhos log n)."""
+        if (self._heap_pop is not pop or len(self._heap) > 2*len(pop)
+                or pop.alteracoes != self._alteracoes_heap):
+            self._versoes = [0]*len(pop)
+            self._heap = [(p, i, 0) for i, p in enumerate(pop.pontuacao.tolist())]
+            heapq.heapify(self._heap)
+            self._heap_pop = pop
+            self._alteracoes_heap = pop.alteracoes
+
+        piores = []
+        while len(piores) < n:
+            _, i, versao = heapq.heappop(self._heap)
+            if versao == self._versoes[i]:
+                piores.append(i)
+
+        return np.array(piores, dtype=np.intp)
+
+
+    def _avalia(self, pop: Populacao, lab: Labirinto, checkpoint: Checkpoint = None) -> None:
+        """Avalia a populacao no grupo de processos, se houver um, ou no proprio processo."""
+        if self._avaliador is not None:
+            self._avaliador.avalia(pop, checkpoint)
+        else:
+            pop.avalia(lab, checkpoint, self.motor)
+
+
+    def _molda(self, pop: Populacao, lab: Labirinto) -> None:
+        """Na aptidao moldada, soma a pontuacao de cada individuo avaliado PESO_DISTANCIA pontos por passo a menos
+           entre a casa onde parou e a comida restante mais proxima, contados a partir da maior distancia do
+           labirinto (quem nao alcanca nenhuma comida restante nao ganha nada). So a pontuacao muda: o checkpoint
+           (pontuacao_corretos) continua sem o bonus, entao os filhos continuam a avaliacao do mesmo jeito."""
+        if self.aptidao != 'moldada':
+            return
+
+        distancia, _ = _comida_mais_proxima(lab, pop.posicao, pop.visitados)
+        pop.pontuacao += (PESO_DISTANCIA*np.maximum(lab.alcance_comidas() - distancia, 0)).astype(pop.pontuacao.dtype)
+        pop.alteracoes += 1
+
+
+    def fit(self, lab: Labirinto, resume_from: str = None) -> None:
         """Metodo principal do programa. Recebe um labirinto e gera toda a execucao para a criacao do algoritmo
            genetico e entrega, se encontrou, a solucao, escrevendo-a em um arquivo de saida, junto com as informacoes sobre 
            cada uma das populacoes anteriores. 
 
         Args:
-            lab (Labirinto): Labirinto que se deseja pegar todos as comidas.
+            lab (Labirinto | LabirintoSet): Labirinto que se deseja pegar todos as comidas. Com um conjunto de labirintos,
+                cada genoma eh avaliado em todos eles e evolui pela pontuacao agregada.
+            resume_from (str, optional): Arquivo de estado (ver arquivo_estado) de onde a execucao continua. O resultado
+                eh identico ao de uma execucao sem interrupcao com a mesma semente. Defaults to None.
 
         Returns:
             None: Nao retorna nada, apenas escreve no arquivo de saida. 
         """        
-        # gera primeira populacao e procura solucao 
-        pop = self.gera_primeira_pop(self.pop_size, lab)
-        solucao = self._procura_solucao(pop, lab)
+        # o cache vale para um labirinto so
+        if self.cache is not None:
+            self.cache.limpa()
+        self._reserva = None
+        self._heap_pop = None
+        self.amostrador.zera()
+        if isinstance(lab, LabirintoSet) and (self.mutacao == 'guiada' or self.aptidao == 'moldada'):
+            raise ValueError('A mutacao guiada e a aptidao moldada precisam de um labirinto so')
+
+        # cria o grupo de processos que avalia as populacoes durante toda a execucao
+        if self.n_jobs > 1 and self.modo == 'geracional':
+            self._avaliador = AvaliadorParalelo(lab, self.pop_size, lab.tamanho_genoma, self.n_jobs, self.motor)
+
+        # so os observadores que chegaram a iniciar sao encerrados (carregar o estado pode falhar antes)
+        iniciados = []
+        try:
+            pop = None
+            if resume_from is not None:
+                pop, marca = self.carrega_estado(resume_from, lab)
+                self.registro.inicia(marca)
+            else:
+                self.registro.inicia()
+            for observador in self.observadores:
+                observador.inicia(self)
+                iniciados.append(observador)
+            self._ultimos_tempos = dict(self.tempos)
+            self._ultimo_instante = time.perf_counter()
+            self._ultimo_cache = self.estatisticas_cache()
+            if self.parada is not None and pop is None:
+                self.parada.reinicia_estado()
+
+            return self._evolui(lab, pop)
+        finally:
+            for observador in iniciados:
+                observador.fim(self)
+            self.registro.fecha()
+            if self._avaliador is not None:
+                self._avaliador.fecha()
+                self._avaliador = None
 
-        # inicializa arquivo
-        open('saida.txt', 'w')
 
-        # escreve no arquivo de saida infos da pop 0
-        self.escreve_geracao(pop, 'saida.txt')
+    def _evolui(self, lab: Labirinto, pop: Populacao = None) -> Individuo:
+        """Gera as populacoes ate encontrar a solucao, convergir ou atingir o maximo de geracoes. Se receber uma
+           populacao (de um estado salvo), continua a partir dela."""
+        solucao = None
+        if pop is None:
+            # gera primeira populacao e procura solucao 
+            pop = self.gera_primeira_pop(self.pop_size, lab)
+            inicio = self._relogio()
+            solucao = self._procura_solucao(pop, lab)
+            inicio = self._cronometra('busca', inicio)
 
-        # verifica se solucao esta na primeira pop
-        if solucao is not None:
-            # escreve no arquivo detalhes da solucao
-            return solucao
+            # escreve no registro infos da pop 0
+            self.registro.escreve_geracao(self.geracoes, pop)
+            self._cronometra('registro', inicio)
 
+            # verifica se solucao esta na primeira pop
+            if solucao is not None:
+                # escreve no arquivo detalhes da solucao
+                self.solucao = solucao
+                self.motivo_parada = 'solucao'
+                self._notifica(pop)
+                return solucao
+
+        convergiu = False
+        self.motivo_parada = 'max_geracoes'
         while solucao is None and self.geracoes < self.max_geracoes:
             # procura solucao na populacao formada
+            inicio = self._relogio()
             solucao = self._procura_solucao(pop, lab)
 
             # se encontrou uma solucao, escreve ela no arquivo e para
             if solucao is not None:
-                self.escreve_solucao(solucao, 'saida.txt', lab)
+                self._cronometra('busca', inicio)
+                self.solucao = solucao
+                self.motivo_parada = 'solucao'
+                self.registro.escreve(self.texto_solucao(solucao, lab))
+                self._notifica(pop)
                 return None
 
             # verifica se a populacao convergiu
             convergiu = self.convergencia(pop)
+            decisao = self.parada.atualiza(self.geracoes, pop) if self.parada is not None and not convergiu else None
+            self._cronometra('busca', inicio)
+            self._notifica(pop)
             if convergiu:
-                with open('saida.txt', 'a') as f:
-                    f.write('\nPopulacao Convergiu!!!!')
+                self.motivo_parada = 'convergencia'
+                self.registro.escreve('\nPopulacao Convergiu!!!!')
                 break
 
+            # para ou reinjeta individuos novos se a populacao estagnou
+            if decisao is not None:
+                acao, motivo = decisao
+                if acao == 'para':
+                    self.motivo_parada = 'estagnacao'
+                    self.registro.escreve(f'\nPopulacao Estagnou na geracao {self.geracoes}: {motivo}')
+                    break
+                self.registro.escreve(f'\nReinicio {self.parada.reinicios} na geracao {self.geracoes}: {motivo}\n')
+                self._reinicia(pop, lab)
+
             # gera nova populacao e coloca ela no arquivo
             pop = self.gera_nova_pop(pop, lab)
-            self.escreve_geracao(pop, 'saida.txt')
+            inicio = self._relogio()
+            self.registro.escreve_geracao(self.geracoes, pop)
+            self._cronometra('registro', inicio)
 
-        # so chega aqui se atingiu o maximo de geracoes
+            # salva o estado para poder retomar a execucao deste ponto
+            if self.arquivo_estado is not None and self.geracoes % self.intervalo_estado == 0:
+                self.salva_estado(self.arquivo_estado, pop, lab)
+
+        # so chega aqui se convergiu, estagnou ou atingiu o maximo de geracoes (a ultima geracao nao foi verificada)
+        if self.motivo_parada == 'max_geracoes':
+            self._notifica(pop)
         return None 
 
 
+    def salva_estado(self, arquivo: str, pop: Populacao, lab: Labirinto) -> None:
+        """Salva tudo o que eh preciso para continuar a execucao depois da geracao atual: genomas (empacotados
+           com 3 bits por movimento, ver o modulo 'genoma') e pontuacoes da populacao, geracao, parametros, estado
+           do gerador aleatorio, assinatura do labirinto e a marca do registro.
+
+        Args:
+            arquivo (str): Arquivo de estado (escrito de forma atomica).
+            pop (Populacao): Populacao atual, ja registrada.
+            lab (Labirinto): Labirinto da execucao.
+        """
+        semente = self._semente
+        info = {
+            'geracoes': self.geracoes,
+            'n_genes': pop.n_genes,
+            'parametros': self._parametros_estado(),
+            'labirinto': lab.assinatura(),
+            'rng': self.rng.bit_generator.state,
+            'semente': {'entropy': semente.entropy, 'spawn_key': list(semente.spawn_key),
+                        'pool_size': semente.pool_size, 'n_children_spawned': semente.n_children_spawned},
+            'registro': self.registro.marca(),
+            'parada': self.parada.estado() if self.parada is not None else None,
+        }
+        salva_estado(arquivo, info, {'genomas_empacotados': empacota(pop.genomas), 'pontuacao': pop.pontuacao, 'comidas': pop.comidas})
+
+
+    def _parametros_estado(self) -> dict:
+        """Parametros que precisam ser iguais para retomar uma execucao salva: HIPERPARAMETROS e as
+           configuracoes do amostrador e do criterio de parada."""
+        parametros = {nome: getattr(self, nome) for nome in HIPERPARAMETROS}
+        parametros['amostrador'] = self.amostrador.configuracao()
+        parametros['parada'] = self.parada.configuracao() if self.parada is not None else None
+
+        return parametros
+
+
+    def carrega_estado(self, arquivo: str, lab: Labirinto) -> tuple:
+        """Restaura um estado salvo por salva_estado e reavalia a populacao salva, conferindo as pontuacoes.
+
+        Args:
+            arquivo (str): Arquivo de estado.
+            lab (Labirinto): Labirinto da execucao; precisa ser o mesmo do estado salvo.
+
+        Returns:
+            tuple: A populacao salva e a marca de onde o registro continua.
+        """
+        info, vetores = carrega_estado(arquivo)
+        if info['labirinto'] != lab.assinatura():
+            raise ValueError(f'O estado {arquivo} foi salvo com outro labirinto')
+        parametros = self._parametros_estado()
+        diferentes = [nome for nome in parametros if info['parametros'].get(nome) != parametros[nome]]
+        if diferentes:
+            raise ValueError(f'O estado {arquivo} foi salvo com outros valores de {", ".join(diferentes)}')
+
+        self.geracoes = info['geracoes']
+        self._semente = np.random.SeedSequence(**info['semente'])
+        self.rng = np.random.default_rng(self._semente)
+        self.rng.bit_generator.state = info['rng']
+        if self.parada is not None and info.get('parada') is not None:
+            self.parada.restaura(info['parada'])
+
+        # a avaliacao eh deterministica, entao so os genomas sao necessarios
+        genomas = desempacota(vetores['genomas_empacotados'], info['n_genes'])
+        pop = Populacao(*genomas.shape)
+        pop.genomas[:] = genomas
+        self._avalia(pop, lab)
+        self._molda(pop, lab)
+        if not (np.array_equal(pop.pontuacao, vetores['pontuacao']) and np.array_equal(pop.comidas, vetores['comidas'])):
+            raise ValueError(f'A reavaliacao da populacao de {arquivo} nao confere com as pontuacoes salvas')
+
+        return pop, info['registro']
+
+
+    def _notifica(self, pop: Populacao) -> None:
+        """Entrega aos observadores as metricas da geracao atual, com o tempo de cada fase desde a anterior.
+           Sem observadores, nao faz nada."""
+        if not self.observadores:
+            return
+
+        agora = time.perf_counter()
+        tempos = {fase: self.tempos[fase] - self._ultimos_tempos[fase] for fase in FASES}
+        cache = self.estatisticas_cache()
+        cache = {nome: cache[nome] - self._ultimo_cache[nome] for nome in ('acertos', 'falhas')}
+        metricas = Metricas(self.geracoes, tempos, agora - self._ultimo_instante, pop, cache)
+        for observador in self.observadores:
+            observador.geracao(metricas)
+
+        # o tempo dos observadores fica fora da proxima geracao
+        self._ultimos_tempos = dict(self.tempos)
+        self._ultimo_cache = self.estatisticas_cache()
+        self._ultimo_instante = time.perf_counter()
+
+
+    def estatisticas_cache(self) -> dict:
+        """Retorna os acertos, as falhas e a taxa de acertos do cache de avaliacao desde o inicio de fit."""
+        if self.cache is None:
+            return {'acertos': 0, 'falhas': 0, 'taxa_acertos': 0.0}
+        return {'acertos': self.cache.acertos, 'falhas': self.cache.falhas, 'taxa_acertos': self.cache.taxa_acertos()}
+
+
     @staticmethod
-    def _elitismo(populacao: list, n: int = 1, reposition: bool = False, reposition_n: int = 1) -> list:
-        """Pega os n melhores individuos de uma populacao e retorna um lista com eles.
+    def _elitismo(populacao: Populacao, n: int = 1, reposition: bool = False, reposition_n: int = 1) -> np.ndarray:
+        """Pega os n melhores individuos de uma populacao e retorna os indices deles.
 
         Args:
-            populacao (list): Lista de individuos que ser quer os melhores. 
+            populacao (Populacao): Populacao que ser quer os melhores. 
             n (int, optional): Quantidade de individuos que se quer pegar da populacao. Defaults to 1.
             reposition (bool, optional): Decide se havera mais de uma copia de cada individuo. Defaults to False.
             reposition_n (int, optional): Quantidade de copias de cada individuo, se houverem. Defaults to 1.
 
         Returns:
-            list: Lista com os melhores individuos.
+            np.ndarray: Indices dos melhores individuos.
         """        
-        # cria dicionario com pontuacao de cada individuo
-        pop = {}
-        for ind in populacao:
-            pop[ind] = ind.pontuacao
-
-        # ordena o dicionario por pontuacao 
-        pop = sorted(pop.items(), key=lambda x: x[1], reverse=True)
-
-        # inicializa variaves 
-        melhores = []
-        contador = 0
+        # pega os n melhores sem ordenar a populacao toda, mantendo a ordem original nos empates
+        melhores = k_melhores(populacao.pontuacao, n)
 
         # faz reposicao dos melhores (pega mais de uma vez cada um)
         if reposition:
-            for i in pop:
-                for _ in range(reposition_n):
-                    new_i = i[0].copy()
-                    melhores.append(new_i)
-                contador += 1
-                if contador == n:
-                    break
-        # pega uma vez cada um dos n melhores
-        else:
-            for i in pop:
-                melhores.append(i[0])
-                contador += 1
-                if contador == n:
-                    break
+            melhores = np.repeat(melhores, reposition_n)
 
         return melhores
 
 
     @staticmethod
-    def _torneio(populacao: list) -> Individuo:
-        """Sorteia dois individuos aleatoriamente e retorna o que tiver a maior pontuacao"""
-        # sorteia dois indices aleatorios
-        index1 = random.randrange(0, len(populacao))
-        index2 = random.randrange(0, len(populacao))
-
-        # pega os dois individuos de acordo com os indices sorteados
-        ind1 = populacao[index1]
-        ind2 = populacao[index2]
-
-        # retorna o que tiver a maior pontuacao
-        if ind1.pontuacao > ind2.pontuacao:
-            return ind1
+    def _torneio(populacao: Populacao, rng: np.random.Generator, n: int = 1, tamanho: int = 2) -> np.ndarray:
+        """Faz n torneios: sorteia os participantes de todos de uma vez e retorna, para cada torneio, o indice
+           do que tiver a maior pontuacao"""
+        return torneio(populacao.pontuacao, rng, n, tamanho)
+
+
+    def _seleciona_pais(self, populacao: Populacao, n: int) -> tuple:
+        """Seleciona os pais e as maes de n pares de filhos com o metodo de selecao da execucao e retorna os
+           dois vetores de indices."""
+        if self.selecao == 'torneio':
+            return (self._torneio(populacao, self.rng, n, self.tamanho_torneio),
+                    self._torneio(populacao, self.rng, n, self.tamanho_torneio))
+
+        # ranking e sus sorteiam todos os pais de uma vez, ja embaralhados
+        if self.selecao == 'ranking':
+            escolhidos = ranking(populacao.pontuacao, self.rng, 2*n)
         else:
-            return ind2
+            escolhidos = sus(pesos_aptidao(populacao.pontuacao), self.rng, 2*n)
+        return escolhidos[0::2], escolhidos[1::2]
 
     
     @staticmethod
-    def _crossover(pai: Individuo, mae: Individuo) -> Individuo:
+    def _crossover(populacao: Populacao, pais: np.ndarray, maes: np.ndarray, filhos: np.ndarray = None, areas: dict = None) -> np.ndarray:
         """Pega os movimentos corretos do pai e junta com o restante dos movimentos da mae para formar o filho 1.
-           Pega os movimentos corretos da mae e junta com o restante dos movimentos do pai para formar o filho 2."""
-        mc_pai = pai.movimentos_corretos
-        mc_mae = mae.movimentos_corretos
+           Pega os movimentos corretos da mae e junta com o restante dos movimentos do pai para formar o filho 2.
+           Retorna os genomas dos filhos intercalados (filho 1 e filho 2 de cada par), escritos em filhos se
+           for passado; com areas (ver _area), os vetores intermediarios sao reaproveitados."""
+        areas = {} if areas is None else areas
+        forma = (len(pais), populacao.n_genes)
+        if filhos is None:
+            filhos = np.empty((2*len(pais), populacao.n_genes), dtype=populacao.genomas.dtype)
+        corretos = _area(areas, 'corretos', forma, populacao.corretos.dtype)
+        prefixo = _area(areas, 'prefixo', forma, bool)
+        posicoes = np.arange(populacao.n_genes)
 
-        ind1 = Individuo()
-        ind1.movimentos = mc_pai + mae.movimentos[len(mc_pai):]
+        # copia o restante do outro e escreve por cima o prefixo correto de quem vem primeiro
+        for k, (primeiro, outro) in enumerate(((pais, maes), (maes, pais))):
+            np.take(populacao.genomas, outro, axis=0, out=filhos[k::2], mode='clip')
+            np.take(populacao.corretos, primeiro, axis=0, out=corretos, mode='clip')
+            np.less(posicoes, populacao.n_corretos[primeiro][:, None], out=prefixo)
+            np.copyto(filhos[k::2], corretos, where=prefixo)
 
-        ind2 = Individuo()
-        ind2.movimentos = mc_mae + pai.movimentos[len(mc_mae):]
-
-        return ind1, ind2 
+        return filhos 
 
 
     @staticmethod
-    def _mutacao_elite(ind: Individuo, lab: Labirinto) -> None:
-        """Para um individuo, pega os movimentos corretos que ele fez e gera uma nova sequencia de movimentos
+    def _mutacao_elite(genomas: np.ndarray, corretos: np.ndarray, n_corretos: np.ndarray, rng: np.random.Generator) -> None:
+        """Para cada elite, pega os movimentos corretos que ele fez e gera uma nova sequencia de movimentos
            aleatorios a partir deles."""
-        mc = ind.movimentos
-        ind.gera_movimentos(lab.caminho.shape[0]**2*3 - len(mc))
-        ind.movimentos = mc + ind.movimentos
+        prefixo = np.arange(genomas.shape[1]) < n_corretos[:, None]
+        aleatorios = rng.integers(0, 8, genomas.shape, dtype=genomas.dtype)
+        genomas[:] = np.where(prefixo, corretos, aleatorios)
 
 
     @staticmethod
-    def _mutacao(ind: Individuo, taxa: float) -> None:
-        """Muta uma porcentagem dos movimentos de um individuo por movimentos aleatorios. A porcentagem eh escolhida 
-           pela taxa."""
-        taxa = taxa * 1000
-        for i in range(len(ind.movimentos)):
-            numero = random.randrange(0, 1000)
-            if numero < taxa:
-                ind.movimentos[i] = random.randint(0,7)
-    
+    def _mutacao(genomas: np.ndarray, taxa: float, rng: np.random.Generator, linhas: np.ndarray = None, areas: dict = None) -> np.ndarray:
+        """Muta uma porcentagem dos movimentos de cada genoma por movimentos aleatorios, no proprio vetor. A porcentagem eh escolhida 
+           pela taxa. Com linhas (em ordem crescente), so esses genomas sao mutados. Retorna a mascara (Bernoulli) dos genes
+           sorteados para mutacao, uma linha por genoma mutado; com areas (ver _area), as mascaras sao reaproveitadas."""
+        areas = {} if areas is None else areas
+        forma = genomas.shape if linhas is None else (len(linhas), genomas.shape[1])
+        sorteio = rng.random(out=_area(areas, 'sorteio', forma, np.float64))
+        mutados = np.less(sorteio, taxa, out=_area(areas, 'mutados', forma, bool))
+
+        mascara = mutados
+        if linhas is not None:
+            mascara = _area(areas, 'mascara', genomas.shape, bool)
+            mascara.fill(False)
+            mascara[linhas] = mutados
+        genomas[mascara] = rng.integers(0, 8, np.count_nonzero(mutados), dtype=genomas.dtype)
+
+        return mutados
+
 
     @staticmethod
-    def _procura_solucao(pop: list, lab: Labirinto) -> Individuo:
-        """Checa todos os individuos de uma populacao e caso algum deles tenha pego todas as comidas, retorna esse individuo."""
-        for ind in pop:
-            if ind.comidas == lab.caminho.shape[0]/2:
-                return ind
+    def _mutacao_guiada(genomas: np.ndarray, linhas: np.ndarray, casas: np.ndarray, passos: np.ndarray, visitados: np.ndarray, lab: Labirinto, rng: np.random.Generator) -> None:
+        """Reescreve, no proprio vetor, os genes de cada genoma das linhas a partir do passo onde termina o
+           prefixo herdado (que para em casas, com as casas visitados) com um caminho minimo ate a comida ainda nao
+           comida mais proxima. Cada movimento eh sorteado entre os que diminuem em 1 a distancia ate essa comida
+           no campo de Labirinto.distancias_comidas, entao cada passo custa O(1). Para na comida ou no fim do
+           genoma; sem comida restante alcancavel, o genoma nao muda."""
+        distancias = lab.distancias_comidas()
+        transicoes = np.asarray(lab.transicoes)
+        distancia, alvo = _comida_mais_proxima(lab, casas, visitados)
+        falta = np.where(distancia < lab.caminho.size, np.minimum(distancia, genomas.shape[1] - passos), 0)
 
+        anda = falta > 0
+        linhas, casa, passo, alvo, falta = linhas[anda], casas[anda].astype(np.intp), passos[anda].astype(np.intp), alvo[anda], falta[anda]
+        while len(linhas) > 0:
+            # movimentos para uma casa um passo mais perto da comida (bater na parede nao muda a distancia)
+            destino = transicoes[casa]
+            perto = (destino != FORA) & (distancias[alvo[:, None], destino] == distancias[alvo, casa][:, None] - 1)
+
+            # sorteia um deles (no caminho minimo sempre ha pelo menos um)
+            escolha = (rng.random(len(linhas))*perto.sum(axis=1)).astype(np.intp)
+            movimento = (np.cumsum(perto, axis=1) > escolha[:, None]).argmax(axis=1)
+            genomas[linhas, passo] = movimento
+            casa = destino[np.arange(len(linhas)), movimento]
+            passo += 1
+            falta -= 1
+
+            anda = falta > 0
+            linhas, casa, passo, alvo, falta = linhas[anda], casa[anda], passo[anda], alvo[anda], falta[anda]
     
-    def escreve_geracao(self, pop: list, arquivo: str) -> None:
-        """Abre o arquivo de saida e escreve os dados de cada individuo de uma populacao especifica."""
-        with open(arquivo, 'a') as f:
-            i = 0
-            f.write(f'Geracao {self.geracoes}\n')
-            for ind in pop:
-                f.write(f'Individuo {i} \n')
-                f.write(f'Pontuacao: {ind.pontuacao} \n')
-                f.write(f'Quantidade de Comidas: {ind.comidas} \n')
-                f.write('-'*50+' \n')
-                i += 1
-            f.write('\n\n\n\n\n')
 
+    @staticmethod
+    def _procura_solucao(pop: Populacao, lab: Labirinto) -> Individuo:
+        """Checa todos os individuos de uma populacao e caso algum deles tenha pego todas as comidas, retorna esse individuo."""
+        encontrados = np.flatnonzero(pop.comidas == lab.limite_comidas)
+        if len(encontrados) > 0:
+            # copia a solucao, porque a populacao eh reescrita duas geracoes depois
+            return pop.seleciona(encontrados[:1])[0]
 
+    
     def escreve_solucao(self, solucao: Individuo, arquivo: str, lab: Labirinto) -> None:
         """Abre o arquivo de saida e escreve todos os dados do individuo solucao e seu passo a passo no 
            no arquivo."""
         with open(arquivo, 'a') as f:
-            # escreve estatisticas da solucao
-            f.write('Encontrei a Solucao!!! \n')
-            f.write(f'Quantidade de geracoes necessarias: {self.geracoes}\n')
-            f.write(f'Quantidade de comidas obtidas: {solucao.comidas}\n')
-            f.write(f'Posicoes exploradas: {solucao.posicoes_percorridas}\n')
-            f.write(f'Movimentos corretos para percorrer o Labirinto: {solucao.movimentos_corretos}\n\n')
-            f.write(f'Sequencia de movimentos ate a resposta:\n')
-
-            # escreve passo a passo da solucao
-            frases = solucao.escreve_movimentos()
-            for frase in frases:
-                f.write(frase)
-
-            # escreve o labirinto percorrido
-            f.write(f'\n\nLabirinto percorrido pela solucao:\n')
-            f.write(f'\'.\' -> posicoes onde passou\n')
-            f.write(f'\'*\' -> posicoes onde pegou uma comida\n')
-            lab.marca_posicoes_percorridas(solucao.posicoes_percorridas)
-            frases = lab.print()
-            for frase in frases:
-                f.write(frase)
+            f.write(self.texto_solucao(solucao, lab))
+
+
+    def texto_solucao(self, solucao: Individuo, lab: Labirinto) -> str:
+        """Monta o texto com todos os dados do individuo solucao, seu passo a passo e o labirinto percorrido.
+           Em um conjunto de labirintos, monta o texto da solucao em cada um deles."""
+        if isinstance(lab, LabirintoSet):
+            textos = []
+            for k in range(len(lab)):
+                ind = Individuo()
+                ind.atribui(solucao)
+                textos.append(f'\nLabirinto {k}:\n')
+                textos.append(self.texto_solucao(ind, Labirinto.de_matriz(lab.caminho[k].copy())))
+            return ''.join(textos)
+
+        # refaz a exploracao para recuperar o caminho percorrido em ordem
+        solucao.explora(lab, guarda_caminho=True)
+
+        # escreve estatisticas da solucao
+        frases = ['Encontrei a Solucao!!! \n']
+        frases.append(f'Quantidade de geracoes necessarias: {self.geracoes}\n')
+        frases.append(f'Quantidade de comidas obtidas: {solucao.comidas}\n')
+        frases.append(f'Posicoes exploradas: {solucao.posicoes_percorridas}\n')
+        frases.append(f'Movimentos corretos para percorrer o Labirinto: {solucao.movimentos_corretos}\n\n')
+        frases.append(f'Sequencia de movimentos ate a resposta:\n')
+
+        # escreve passo a passo da solucao
+        frases.extend(solucao.escreve_movimentos())
+
+        # escreve o labirinto percorrido
+        frases.append(f'\n\nLabirinto percorrido pela solucao:\n')
+        frases.append(f'\'.\' -> posicoes onde passou\n')
+        frases.append(f'\'*\' -> posicoes onde pegou uma comida\n')
+        # marca uma copia: o caminho do labirinto recebido continua valendo para outras execucoes
+        percorrido = Labirinto.de_matriz(lab.caminho.copy())
+        percorrido.marca_posicoes_percorridas(solucao.posicoes_percorridas)
+        frases.extend(percorrido.print())
+
+        return ''.join(frases)
 
 
     @staticmethod
-    def convergencia(pop: list) -> bool:
+    def convergencia(pop: Populacao) -> bool:
         """Verifica se a maioriaa dos individuos da populacao tem a mesma pontuacao. Se tivirem, retorna 
            verdadeiro."""
-        pontuacoes = []
-        # coloca cada uma das pontuacoes distintas na lista de pontuacao
-        for ind in pop:
-            if ind.pontuacao in pontuacoes:
-                pass
-            else:
-                pontuacoes.append(ind.pontuacao)
-
-        # verifica se menos de 5% dos individuos sao diferentes
-        if len(pontuacoes) < 2:
+        # verifica se menos de 2 pontuacoes distintas existem na populacao
+        if len(np.unique(pop.pontuacao)) < 2:
             return True
 
         return False
+
+
+def parametros_json(parametros: dict) -> dict:
+    """Converte parametros de AlgoritmoGenetico em valores json, sempre do mesmo jeito para os mesmos parametros
+       (usados na chave e no arquivo do cache da busca). Objetos com configuracao(), como CriterioParada e
+       Amostrador, viram {'classe': nome da classe, **configuracao()}.
+
+    Args:
+        parametros (dict): Parametros de AlgoritmoGenetico.
+
+    Raises:
+        ValueError: Se algum parametro nao eh um valor json nem tem configuracao().
+
+    Returns:
+        dict: Parametros convertidos.
+    """
+    return {nome: _valor_json(nome, valor) for nome, valor in parametros.items()}
+
+
+def _valor_json(nome: str, valor):
+    """Converte o valor do parametro nome (ver parametros_json)."""
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple)):
+        return [_valor_json(nome, item) for item in valor]
+    if isinstance(valor, dict) and all(isinstance(chave, str) for chave in valor):
+        return {chave: _valor_json(nome, item) for chave, item in valor.items()}
+    if hasattr(valor, 'configuracao'):
+        return {'classe': type(valor).__name__, **valor.configuracao()}
+    raise ValueError(f'O parametro {nome} nao eh um valor json nem tem configuracao(): {valor!r}')
+
+
+def executa_tentativa(caminho: np.ndarray, parametros: dict, seed: int) -> dict:
+    """Executa o algoritmo genetico uma vez, com uma semente, sem escrever registro, e retorna o resultado.
+
+    Args:
+        caminho (np.ndarray): Matriz do labirinto.
+        parametros (dict): Parametros de AlgoritmoGenetico.
+        seed (int): Semente dos geradores aleatorios.
+
+    Returns:
+        dict: Parametros, semente, se resolveu, quantidade de geracoes e tempo de execucao (s).
+    """
+    lab = Labirinto.de_matriz(caminho)
+    ag = AlgoritmoGenetico(**parametros, registro=RegistroNulo(), seed=seed)
+
+    inicio = time.perf_counter()
+    ag.fit(lab)
+    tempo = time.perf_counter() - inicio
+
+    return {'parametros': parametros, 'seed': seed, 'resolveu': ag.solucao is not None,
+            'geracoes': ag.geracoes, 'tempo': tempo}
+
+
+class GridSearch:
+
+    def __init__(self, param_grid: dict, n_seeds: int = 3, n_jobs: int = 1, cache: str = '.cache_busca', **fixos) -> None:
+        """Inicializa a busca em grade de parametros do algoritmo genetico.
+
+        Args:
+            param_grid (dict): Para cada parametro de AlgoritmoGenetico, a lista de valores testados.
+            n_seeds (int, optional): Quantidade de sementes executadas para cada configuracao. Defaults to 3.
+            n_jobs (int, optional): Quantidade de processos que executam as tentativas. Defaults to 1.
+            cache (str, optional): Pasta onde o resultado de cada tentativa eh guardado. None desliga o cache. Defaults to '.cache_busca'.
+            **fixos: Parametros de AlgoritmoGenetico iguais em todas as configuracoes.
+        """
+        self.param_grid = param_grid
+        self.n_seeds = n_seeds
+        self.n_jobs = n_jobs
+        self.cache = cache
+        self.fixos = fixos
+        self.resultados = []
+
+
+    def configuracoes(self) -> list:
+        """Retorna a lista de configuracoes (dicionarios de parametros) testadas."""
+        nomes = sorted(self.param_grid)
+        return [dict(self.fixos, **dict(zip(nomes, valores)))
+                for valores in itertools.product(*(self.param_grid[nome] for nome in nomes))]
+
+
+    def fit(self, lab: Labirinto) -> list:
+        """Executa todas as configuracoes com todas as sementes e guarda os resultados.
+
+        Args:
+            lab (Labirinto): Labirinto usado em todas as tentativas.
+
+        Returns:
+            list: Resultado de cada tentativa (ver executa_tentativa).
+        """
+        self.resultados = self._executa(lab, self.configuracoes())
+
+        return self.resultados
+
+
+    def _arquivo_cache(self, lab: Labirinto, parametros: dict, seed: int) -> str:
+        """Caminho do arquivo de cache de uma tentativa, identificada pelo labirinto, parametros (ja convertidos
+           por parametros_json) e semente."""
+        chave = json.dumps({'lab': lab.assinatura(), 'parametros': parametros, 'seed': seed}, sort_keys=True)
+        return os.path.join(self.cache, hashlib.sha1(chave.encode()).hexdigest() + '.json')
+
+
+    def _executa(self, lab: Labirinto, configuracoes: list) -> list:
+        """Executa as tentativas que nao estao no cache, em paralelo, e guarda cada uma no cache assim que termina.
+           Com cache, todos os parametros sao convertidos por parametros_json antes de executar qualquer tentativa."""
+        resultados = []
+        pendentes = []
+        for parametros in configuracoes:
+            convertidos = parametros_json(parametros) if self.cache is not None else None
+            for seed in range(self.n_seeds):
+                arquivo = self._arquivo_cache(lab, convertidos, seed) if self.cache is not None else None
+                if arquivo is not None and os.path.exists(arquivo):
+                    with open(arquivo) as f:
+                        # os parametros do arquivo estao convertidos; o resultado guarda os originais
+                        resultados.append(dict(json.load(f), parametros=parametros))
+                else:
+                    pendentes.append((parametros, seed, (arquivo, convertidos)))
+
+        if self.cache is not None:
+            os.makedirs(self.cache, exist_ok=True)
+
+        def guarda(resultado: dict, destino: tuple) -> None:
+            resultados.append(resultado)
+            arquivo, convertidos = destino
+            if arquivo is not None:
+                temporario = f'{arquivo}.{os.getpid()}.tmp'
+                try:
+                    with open(temporario, 'w') as f:
+                        json.dump(dict(resultado, parametros=convertidos), f)
+                    os.replace(temporario, arquivo)
+                finally:
+                    if os.path.exists(temporario):
+                        os.remove(temporario)
+
+        if self.n_jobs > 1:
+            with ProcessPoolExecutor(self.n_jobs) as executor:
+                tarefas = {executor.submit(executa_tentativa, lab.caminho, parametros, seed): destino
+                           for parametros, seed, destino in pendentes}
+                for tarefa in as_completed(tarefas):
+                    guarda(tarefa.result(), tarefas[tarefa])
+        else:
+            for parametros, seed, destino in pendentes:
+                guarda(executa_tentativa(lab.caminho, parametros, seed), destino)
+
+        return resultados
+
+
+class RandomSearch(GridSearch):
+
+    def __init__(self, param_grid: dict, n_iter: int = 10, seed: int = None, **kwargs) -> None:
+        """Inicializa a busca aleatoria: testa n_iter configuracoes sorteadas da grade.
+
+        Args:
+            param_grid (dict): Para cada parametro de AlgoritmoGenetico, a lista de valores possiveis.
+            n_iter (int, optional): Quantidade de configuracoes sorteadas. Defaults to 10.
+            seed (int, optional): Semente do sorteio das configuracoes. Defaults to None.
+            **kwargs: Demais argumentos de GridSearch.
+        """
+        super().__init__(param_grid, **kwargs)
+        self.n_iter = n_iter
+        self.seed = seed
+
+
+    def configuracoes(self) -> list:
+        todas = super().configuracoes()
+        sorteio = np.random.default_rng(self.seed).choice(len(todas), min(self.n_iter, len(todas)), replace=False)
+        return [todas[i] for i in sorteio]
+
+
+class SuccessiveHalving(GridSearch):
+
+    def __init__(self, param_grid: dict, geracoes_iniciais: int = 50, fator: int = 2, max_geracoes: int = 1000, **kwargs) -> None:
+        """Inicializa a busca por eliminacao sucessiva: todas as configuracoes rodam com poucas geracoes, so a 
+           melhor fracao (1/fator) continua, com fator vezes mais geracoes, ate sobrar uma configuracao ou
+           atingir max_geracoes.
+
+        Args:
+            param_grid (dict): Para cada parametro de AlgoritmoGenetico, a lista de valores testados.
+            geracoes_iniciais (int, optional): max_geracoes da primeira rodada. Defaults to 50.
+            fator (int, optional): Quanto as configuracoes sao reduzidas e as geracoes aumentadas a cada rodada. Defaults to 2.
+            max_geracoes (int, optional): Limite de geracoes da ultima rodada. Defaults to 1000.
+            **kwargs: Demais argumentos de GridSearch.
+        """
+        super().__init__(param_grid, **kwargs)
+        self.geracoes_iniciais = geracoes_iniciais
+        self.fator = fator
+        self.max_geracoes = max_geracoes
+
+
+    def fit(self, lab: Labirinto) -> list:
+        configuracoes = self.configuracoes()
+        geracoes = self.geracoes_iniciais
+        self.resultados = []
+
+        while True:
+            rodada = [dict(parametros, max_geracoes=geracoes) for parametros in configuracoes]
+            resultados = self._executa(lab, rodada)
+            self.resultados.extend(resultados)
+            if len(configuracoes) == 1 or geracoes >= self.max_geracoes:
+                break
+
+            # continua so com a melhor fracao das configuracoes
+            ranking = classifica_configuracoes(resultados)
+            configuracoes = [dict(item['parametros']) for item in ranking[:max(1, len(ranking) // self.fator)]]
+            for parametros in configuracoes:
+                parametros.pop('max_geracoes')
+            geracoes = min(geracoes*self.fator, self.max_geracoes)
+
+        return self.resultados
+
+
+def classifica_configuracoes(resultados: list) -> list:
+    """Agrupa os resultados por configuracao e ordena da melhor para a pior: mais sementes resolvidas, 
+       menos geracoes ate a solucao e menos tempo.
+
+    Args:
+        resultados (list): Resultados de executa_tentativa.
+
+    Returns:
+        list: Um resumo por configuracao (parametros, taxa de solucao, media de geracoes e de tempo), o melhor primeiro.
+    """
+    grupos = {}
+    for resultado in resultados:
+        chave = json.dumps(resultado['parametros'], sort_keys=True, default=str)
+        grupos.setdefault(chave, []).append(resultado)
+
+    resumo = []
+    for grupo in grupos.values():
+        resolvidos = [r for r in grupo if r['resolveu']]
+        resumo.append({
+            'parametros': grupo[0]['parametros'],
+            'tentativas': len(grupo),
+            'taxa_solucao': len(resolvidos) / len(grupo),
+            'geracoes': float(np.mean([r['geracoes'] for r in resolvidos])) if resolvidos else float('inf'),
+            'tempo': float(np.mean([r['tempo'] for r in grupo])),
+        })
+
+    return sorted(resumo, key=lambda r: (-r['taxa_solucao'], r['geracoes'], r['tempo']))
+
+
+def retorna_melhor_solucao(resultados: list) -> dict:
+    """Retorna o resumo da melhor configuracao: a que mais resolve, em menos geracoes e menos tempo.
+
+    Args:
+        resultados (list): Resultados de GridSearch.fit (ou GridSearch.resultados).
+
+    Returns:
+        dict: Resumo da melhor configuracao (ver classifica_configuracoes), ou None se nao houver resultados.
+    """
+    ranking = classifica_configuracoes(resultados)
+    return ranking[0] if ranking else None
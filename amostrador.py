@@ -0,0 +1,146 @@
+from labirinto import Labirinto, LabirintoSet, FORA
+from populacao import Populacao
+from avaliacao import MOTORES
+import numpy as np
+
+# quantidade de valores de cada sorteio do movimento legal (minimo multiplo comum de 1 a 8)
+_SORTEIOS = 840
+
+
+class Amostrador:
+
+    def __init__(self, legais: bool = False, max_tentativas: int = None, max_genes_lote: int = 1 << 22) -> None:
+        """Inicializa o amostrador de genomas aleatorios da primeira geracao (e dos reinicios). Os candidatos
+           sao sorteados e avaliados em lotes e, com filtro, so ficam os de pontuacao positiva.
+
+           Sem legais, os movimentos sao sorteados como em Individuo.gera_movimentos e so os sorteios dos
+           candidatos usados sao consumidos do gerador aleatorio, entao a populacao eh a mesma de sortear e
+           explorar um candidato por vez. Com legais, cada movimento eh sorteado entre os que, da casa atual,
+           vao para uma casa livre (nem parede nem fora do labirinto), entao quase nenhum candidato eh descartado.
+
+        Args:
+            legais (bool, optional): Sorteia so movimentos legais a partir da casa atual. Defaults to False.
+            max_tentativas (int, optional): Quantidade maxima de candidatos avaliados pelo filtro; depois dela, os
+                genomas que faltam entram sem filtro. None nao limita. Defaults to None.
+            max_genes_lote (int, optional): Quantidade maxima de genes sorteados de uma vez (limita a memoria). Defaults to 4M.
+        """
+        self.legais = legais
+        self.max_tentativas = max_tentativas
+        self.max_genes_lote = max_genes_lote
+        self.zera()
+
+
+    def configuracao(self) -> dict:
+        """Retorna os parametros do sorteio, serializaveis em json (max_genes_lote fica de fora: so limita a memoria)."""
+        return {'legais': self.legais, 'max_tentativas': self.max_tentativas}
+
+
+    def zera(self) -> None:
+        """Zera as estatisticas (chamado no inicio de fit)."""
+        self.tentativas = 0
+        self.aceitos = 0
+        self.lotes = 0
+        self.sem_filtro = 0
+
+
+    def estatisticas(self) -> dict:
+        """Retorna os candidatos avaliados, os aceitos, a taxa de aceitacao, os lotes e os genomas que entraram
+           sem filtro por causa de max_tentativas."""
+        taxa = self.aceitos / self.tentativas if self.tentativas else 0.0
+        return {'tentativas': self.tentativas, 'aceitos': self.aceitos, 'taxa_aceitacao': taxa,
+                'lotes': self.lotes, 'sem_filtro': self.sem_filtro}
+
+
+    def sorteia(self, pop: Populacao, lab: Labirinto, rng: np.random.Generator, filtra: bool = True, motor: str = 'lote') -> bool:
+        """Preenche os genomas da populacao com movimentos aleatorios. Os candidatos aceitos pelo filtro ja
+           foram avaliados, entao o resultado deles eh guardado na populacao.
+
+        Args:
+            pop (Populacao): Populacao preenchida.
+            lab (Labirinto | LabirintoSet): Labirinto onde os candidatos sao avaliados.
+            rng (np.random.Generator): Gerador aleatorio.
+            filtra (bool, optional): So aceita candidatos de pontuacao positiva. Defaults to True.
+            motor (str, optional): Motor de avaliacao dos candidatos (ver avaliacao.MOTORES). Defaults to 'lote'.
+
+        Returns:
+            bool: Se toda a populacao ja esta avaliada (senao, ainda precisa ser avaliada).
+        """
+        if self.legais and isinstance(lab, LabirintoSet):
+            raise ValueError('O sorteio de movimentos legais precisa de um labirinto so')
+
+        genomas = pop.genomas
+        n, n_genes = genomas.shape
+        i = 0
+        taxa = 1.0
+        while i < n:
+            faltam = n - i
+            limitado = filtra and self.max_tentativas is not None and self.tentativas >= self.max_tentativas
+            if not filtra or limitado:
+                # sem filtro, sorteia exatamente os que faltam
+                genomas[i:] = self._candidatos(faltam, n_genes, lab, rng)
+                if limitado:
+                    self.sem_filtro += faltam
+                return False
+
+            # sorteia mais candidatos que o necessario pela taxa de aceitacao vista ate agora
+            tamanho = int(np.ceil(faltam / max(taxa, 1/64)))
+            tamanho = max(1, min(tamanho, self.max_genes_lote // n_genes))
+            if self.max_tentativas is not None:
+                tamanho = min(tamanho, self.max_tentativas - self.tentativas)
+            estado = rng.bit_generator.state
+            candidatos = self._candidatos(tamanho, n_genes, lab, rng)
+            resultado = MOTORES[motor](candidatos, lab)
+            aceitos = np.flatnonzero(resultado.pontuacao > 0)[:faltam]
+
+            # se sobraram candidatos, volta o gerador e consome so os sorteios dos usados
+            usados = aceitos[-1] + 1 if len(aceitos) == faltam else tamanho
+            if usados < tamanho:
+                rng.bit_generator.state = estado
+                self._candidatos(usados, n_genes, lab, rng)
+
+            genomas[i:i + len(aceitos)] = candidatos[aceitos]
+            pop.guarda(resultado.seleciona(aceitos), slice(i, i + len(aceitos)))
+            i += len(aceitos)
+            self.tentativas += int(usados)
+            self.aceitos += len(aceitos)
+            self.lotes += 1
+            taxa = self.aceitos / self.tentativas
+
+        return True
+
+
+    def _candidatos(self, n: int, n_genes: int, lab: Labirinto, rng: np.random.Generator) -> np.ndarray:
+        """Sorteia n genomas (uniformes ou so com movimentos legais)."""
+        if self.legais:
+            return self._candidatos_legais(n, n_genes, lab, rng)
+        # inteiros de 64 bits, como Individuo.gera_movimentos, para consumir o gerador do mesmo jeito
+        return rng.integers(0, 8, (n, n_genes)).astype(np.uint8)
+
+
+    @staticmethod
+    def _candidatos_legais(n: int, n_genes: int, lab: Labirinto, rng: np.random.Generator) -> np.ndarray:
+        """Sorteia n genomas andando pelo labirinto: cada movimento eh sorteado entre os legais da casa atual.
+           De uma casa sem movimento legal, sorteia entre os 8."""
+        transicoes = np.asarray(lab.transicoes)
+        casas = np.arange(len(transicoes))[:, None]
+        legal = (transicoes != FORA) & (transicoes != casas)
+        n_legais = legal.sum(axis=1)
+        n_opcoes = np.where(n_legais > 0, n_legais, 8)
+
+        # um sorteio j em [0, 840) escolhe o movimento j*n_opcoes//840 entre os legais da casa (840 eh divisivel
+        # por 1..8, entao a escolha eh uniforme); as tabelas dao o movimento e a casa seguinte de cada (casa, j)
+        ordem = np.where(n_legais[:, None] > 0, np.argsort(~legal, axis=1, kind='stable'), np.arange(8))
+        tabela = np.take_along_axis(ordem, np.arange(_SORTEIOS)[None, :]*n_opcoes[:, None] // _SORTEIOS, axis=1)
+        seguinte = np.take_along_axis(transicoes, tabela, axis=1)
+        seguinte = np.where(seguinte == FORA, casas, seguinte)
+        tabela, seguinte = tabela.ravel().astype(np.uint8), seguinte.ravel().astype(np.intp)
+
+        sorteios = np.ascontiguousarray(rng.integers(0, _SORTEIOS, (n, n_genes)).T)
+        genomas = np.empty((n_genes, n), dtype=np.uint8)
+        casa = np.full(n, lab.indice(lab.pos_inicial), dtype=np.intp)
+        for t in range(n_genes):
+            indices = casa*_SORTEIOS + sorteios[t]
+            genomas[t] = tabela[indices]
+            casa = seguinte[indices]
+
+        return np.ascontiguousarray(genomas.T)
@@ -0,0 +1,329 @@
+from labirinto import Labirinto, LabirintoSet, FORA
+import numpy as np
+
+
+class Checkpoint:
+
+    def __init__(self, passo: np.ndarray, posicao: np.ndarray, visitados: np.ndarray, pontuacao: np.ndarray, comidas: np.ndarray) -> None:
+        """Estado da exploracao de cada individuo no fim de um prefixo do genoma formado so por movimentos
+           corretos (como os movimentos corretos herdados no crossover). A avaliacao continua dali em vez de
+           refazer o prefixo.
+
+        Args:
+            passo (np.ndarray): Indice do gene onde a exploracao continua (0 = comeca do inicio).
+            posicao (np.ndarray): Casa (linha*colunas + coluna) onde o individuo esta.
+            visitados (np.ndarray): Casas ja visitadas, em bits empacotados por linha (np.packbits).
+            pontuacao (np.ndarray): Pontuacao obtida no prefixo.
+            comidas (np.ndarray): Comidas obtidas no prefixo.
+        """
+        self.passo = passo
+        self.posicao = posicao
+        self.visitados = visitados
+        self.pontuacao = pontuacao
+        self.comidas = comidas
+
+
+# campos de AvaliacaoLote, na ordem do construtor
+CAMPOS = ('pontuacao', 'comidas', 'n_corretos', 'corretos', 'visitados', 'posicao', 'pontuacao_corretos')
+
+
+class AvaliacaoLote:
+
+    def __init__(self, pontuacao: np.ndarray, comidas: np.ndarray, n_corretos: np.ndarray, corretos: np.ndarray, visitados: np.ndarray, posicao: np.ndarray, pontuacao_corretos: np.ndarray) -> None:
+        """Guarda o resultado da avaliacao de um lote de genomas.
+
+        Args:
+            pontuacao (np.ndarray): Pontuacao de cada individuo.
+            comidas (np.ndarray): Quantidade de comidas obtidas por cada individuo.
+            n_corretos (np.ndarray): Quantidade de movimentos corretos de cada individuo.
+            corretos (np.ndarray): Matriz booleana (n, genoma) marcando os movimentos corretos.
+            visitados (np.ndarray): Matriz booleana (n, linhas*colunas) marcando as casas visitadas.
+            posicao (np.ndarray): Casa (linha*colunas + coluna) onde cada individuo parou.
+            pontuacao_corretos (np.ndarray): Pontuacao somando so os movimentos corretos (sem as paredes).
+        """
+        self.pontuacao = pontuacao
+        self.comidas = comidas
+        self.n_corretos = n_corretos
+        self.corretos = corretos
+        self.visitados = visitados
+        self.posicao = posicao
+        self.pontuacao_corretos = pontuacao_corretos
+
+
+    def seleciona(self, linhas: np.ndarray) -> 'AvaliacaoLote':
+        """Retorna o resultado so dos individuos indicados."""
+        return AvaliacaoLote(*(getattr(self, nome)[linhas] for nome in CAMPOS))
+
+
+    def movimentos_corretos(self, genomas: np.ndarray, i: int) -> list:
+        """Retorna a lista de movimentos corretos do individuo i, como em Individuo.movimentos_corretos."""
+        return genomas[i][self.corretos[i]].tolist()
+
+
+    def posicoes_visitadas(self, i: int, n_colunas: int) -> set:
+        """Retorna o conjunto de coordenadas visitadas pelo individuo i."""
+        return {(int(c) // n_colunas, int(c) % n_colunas) for c in np.flatnonzero(self.visitados[i])}
+
+
+def avalia_lote(genomas: np.ndarray, lab: Labirinto, checkpoint: Checkpoint = None) -> AvaliacaoLote:
+    """Executa os movimentos de todos os individuos ao mesmo tempo, um passo por vez, com as mesmas
+       regras de Individuo.explora: parede = -1, casa ja visitada = 0, casa nova = 3, comida = 10, para
+       quando sai do labirinto ou quando pega lab.limite_comidas comidas.
+
+    Args:
+        genomas (np.ndarray): Matriz (n, genoma) de inteiros (int8 ou uint8) com os movimentos de cada individuo.
+        lab (Labirinto): Labirinto onde os movimentos sao executados. Com um LabirintoSet, usa avalia_conjunto.
+        checkpoint (Checkpoint, optional): Estado de onde cada individuo continua a exploracao. Os genes antes
+            de checkpoint.passo sao tratados como movimentos corretos ja avaliados. Defaults to None.
+
+    Returns:
+        AvaliacaoLote: Pontuacao, comidas, movimentos corretos e casas visitadas de cada individuo.
+    """
+    if isinstance(lab, LabirintoSet):
+        return avalia_conjunto(genomas, lab, checkpoint)
+
+    genomas = np.asarray(genomas)
+    casa_inicial = np.full(len(genomas), lab.indice(lab.pos_inicial), dtype=np.int64)
+    resultado, pontuacao_corretos = _explora_lote(genomas, lab.transicoes, np.frombuffer(lab.mascara_comidas, dtype=bool),
+                                                  casa_inicial, None, lab.limite_comidas, lab.caminho.size, checkpoint)
+
+    return AvaliacaoLote(*resultado, pontuacao_corretos)
+
+
+def avalia_conjunto(genomas: np.ndarray, conjunto: LabirintoSet, checkpoint: Checkpoint = None) -> AvaliacaoLote:
+    """Avalia cada genoma em todos os labirintos do conjunto em um unico lote (labirintos x individuos linhas)
+       e junta as pontuacoes com a agregacao do conjunto ('media' eh arredondada para inteiro).
+
+       Comidas eh o minimo entre os labirintos, entao um individuo so resolve o conjunto se resolver todos.
+       Movimentos corretos sao os que andam (sem bater em parede e antes de parar) em todos os labirintos, e
+       as casas visitadas sao as visitadas em algum labirinto. Como esse estado nao continua a exploracao de nenhum labirinto,
+       quem ainda tem genes para andar eh avaliado do inicio. Os individuos com checkpoint.passo no fim do genoma
+       (ja avaliados: achados no cache, repetidos e elites) ficam fora do lote e recebem o resultado do
+       checkpoint, como em avalia_lote.
+
+    Args:
+        genomas (np.ndarray): Matriz (n, genoma) com os movimentos de cada individuo.
+        conjunto (LabirintoSet): Labirintos onde os movimentos sao executados.
+        checkpoint (Checkpoint, optional): Estado de cada individuo; so passo no fim do genoma eh usado. Defaults to None.
+
+    Returns:
+        AvaliacaoLote: Resultado agregado de cada individuo.
+    """
+    genomas = np.asarray(genomas)
+    n, n_genes = genomas.shape
+    if checkpoint is not None and np.any(checkpoint.passo >= n_genes):
+        # avalia so quem anda e espalha o resultado entre os ja avaliados
+        andam = np.flatnonzero(checkpoint.passo < n_genes)
+        n_casas = conjunto.n_linhas*conjunto.n_colunas
+        resultado = AvaliacaoLote(checkpoint.pontuacao.astype(np.int32), checkpoint.comidas.astype(np.int32),
+                                  np.full(n, n_genes, dtype=np.int32), np.ones((n, n_genes), dtype=bool),
+                                  np.unpackbits(checkpoint.visitados, axis=1, count=n_casas).astype(bool),
+                                  checkpoint.posicao.astype(np.int32), checkpoint.pontuacao.astype(np.int32))
+        parcial = avalia_conjunto(genomas[andam], conjunto)
+        for nome in CAMPOS:
+            getattr(resultado, nome)[andam] = getattr(parcial, nome)
+        return resultado
+
+    m = len(conjunto)
+    n_casas = conjunto.n_linhas*conjunto.n_colunas
+
+    # a linha k*n + i eh o individuo i no labirinto k
+    resultado, pontuacao_corretos = _explora_lote(np.tile(genomas, (m, 1)), conjunto.transicoes,
+                                                  np.frombuffer(conjunto.mascara_comidas, dtype=bool),
+                                                  np.repeat(conjunto.casas_iniciais, n), np.repeat(conjunto.bases, n),
+                                                  conjunto.limite_comidas, n_casas)
+    pontuacao, comidas, _, corretos, visitados, posicao = (valor.reshape((m, n) + valor.shape[1:]) for valor in resultado)
+    pontuacao_corretos = pontuacao_corretos.reshape(m, n)
+
+    agrega = {'media': lambda v: np.rint(v.mean(axis=0)), 'min': lambda v: v.min(axis=0), 'soma': lambda v: v.sum(axis=0)}[conjunto.agregacao]
+    corretos = corretos.all(axis=0)
+
+    return AvaliacaoLote(agrega(pontuacao).astype(np.int32), comidas.min(axis=0), corretos.sum(axis=1, dtype=np.int32),
+                         corretos, visitados.any(axis=0), posicao[0], agrega(pontuacao_corretos).astype(np.int32))
+
+
+def _explora_lote(genomas: np.ndarray, transicoes: np.ndarray, comida: np.ndarray, casa_inicial: np.ndarray,
+                  base: np.ndarray, limite: float, n_casas: int, checkpoint: Checkpoint = None) -> tuple:
+    """Laco da avaliacao em lote. As casas sao indices das linhas de transicoes e de comida; com base, a linha i
+       anda no labirinto cujas casas comecam em base[i] (casas visitadas e posicao sao relativas a base).
+
+    Returns:
+        tuple: (pontuacao, comidas, n_corretos, corretos, visitados, posicao) e a pontuacao dos movimentos corretos.
+    """
+    n, n_genes = genomas.shape
+
+    # estado de cada individuo
+    linhas = np.arange(n)
+    casa = casa_inicial.copy()
+    passo = np.zeros(n, dtype=np.int64)
+    pontuacao = np.zeros(n, dtype=np.int32)
+    paredes = np.zeros(n, dtype=np.int32)
+    comidas = np.zeros(n, dtype=np.int32)
+    corretos = np.zeros((n, n_genes), dtype=bool)
+    visitados = np.zeros((n, n_casas), dtype=bool)
+    visitados[linhas, casa_inicial if base is None else casa_inicial - base] = True
+
+    # continua a exploracao de onde o checkpoint parou
+    if checkpoint is not None:
+        passo[:] = checkpoint.passo
+        retomados = passo > 0
+        casa[retomados] = checkpoint.posicao[retomados]
+        visitados[retomados] = np.unpackbits(checkpoint.visitados[retomados], axis=1, count=n_casas)
+        pontuacao[retomados] = checkpoint.pontuacao[retomados]
+        comidas[retomados] = checkpoint.comidas[retomados]
+        corretos[:] = np.arange(n_genes) < passo[:, None]
+
+    # quem nao tem genes para andar (passo = tamanho do genoma) ja esta pronto
+    ativo = (comidas < limite) & (passo < n_genes)
+
+    for t in range(int(passo.min()) if n > 0 else 0, n_genes):
+        if not ativo.any():
+            break
+
+        # so anda quem ja passou do prefixo avaliado
+        andando = ativo & (passo <= t)
+
+        # gera nova posicao de todos os individuos com uma consulta na tabela de transicoes
+        destino = transicoes[casa, genomas[:, t]]
+
+        # quem saiu do labirinto para de andar
+        dentro = destino != FORA
+        ativo &= dentro | ~andando
+        andando &= dentro
+        destino = np.where(dentro, destino, casa)
+
+        # pontua o movimento
+        bateu = andando & (destino == casa)
+        andou = andando & ~bateu
+        local = destino if base is None else destino - base
+        novo = andou & ~visitados[linhas, local]
+        pegou = novo & comida[destino]
+
+        visitados[linhas[novo], local[novo]] = True
+        paredes += bateu
+        pontuacao += 3*novo + 7*pegou
+        comidas += pegou
+        corretos[:, t] |= andou
+
+        # atualiza a posicao de partida
+        casa = np.where(andou, destino, casa)
+
+        # quem pegou comidas suficientes para de andar
+        ativo &= comidas < limite
+
+    n_corretos = corretos.sum(axis=1, dtype=np.int32)
+    posicao = (casa if base is None else casa - base).astype(np.int32)
+
+    return (pontuacao - paredes, comidas, n_corretos, corretos, visitados, posicao), pontuacao
+
+
+def avalia_compacto(genomas: np.ndarray, lab: Labirinto, checkpoint: Checkpoint = None, k: int = 2) -> AvaliacaoLote:
+    """Avalia em lote com as mesmas regras de avalia_lote, mas so com os individuos que ainda estao andando:
+       cada um tem o proprio passo no genoma, quem sai do labirinto, pega limite_comidas comidas ou chega ao fim do
+       genoma eh retirado do lote, e os movimentos sao feitos de k em k com a tabela de k passos do labirinto
+       (uma consulta por bloco em vez de uma por movimento). Ganha de avalia_lote quando os individuos param
+       em momentos muito diferentes, porque avalia_lote continua processando as linhas paradas ate o ultimo
+       individuo parar.
+
+    Args:
+        genomas (np.ndarray): Matriz (n, genoma) com os movimentos de cada individuo.
+        lab (Labirinto): Labirinto onde os movimentos sao executados. Com um LabirintoSet, usa avalia_conjunto.
+        checkpoint (Checkpoint, optional): Estado de onde cada individuo continua a exploracao. Defaults to None.
+        k (int, optional): Quantidade de movimentos de cada bloco. A tabela tem casas*8**k*k posicoes. Defaults to 2.
+
+    Returns:
+        AvaliacaoLote: Pontuacao, comidas, movimentos corretos e casas visitadas de cada individuo.
+    """
+    if isinstance(lab, LabirintoSet):
+        return avalia_conjunto(genomas, lab, checkpoint)
+
+    genomas = np.asarray(genomas)
+    n, n_genes = genomas.shape
+    n_casas = lab.caminho.size
+    limite = lab.limite_comidas
+    tabela = lab.transicoes_passos(k)
+    comida = np.frombuffer(lab.mascara_comidas, dtype=bool)
+
+    # resultado de cada individuo, escrito quando ele sai do lote
+    casa_final = np.full(n, lab.indice(lab.pos_inicial), dtype=np.int64)
+    passo = np.zeros(n, dtype=np.int64)
+    pontuacao = np.zeros(n, dtype=np.int32)
+    paredes = np.zeros(n, dtype=np.int32)
+    comidas = np.zeros(n, dtype=np.int32)
+    corretos = np.zeros((n, n_genes), dtype=bool)
+    visitados = np.zeros((n, n_casas), dtype=bool)
+    visitados[:, lab.indice(lab.pos_inicial)] = True
+
+    if checkpoint is not None:
+        passo[:] = checkpoint.passo
+        retomados = passo > 0
+        casa_final[retomados] = checkpoint.posicao[retomados]
+        visitados[retomados] = np.unpackbits(checkpoint.visitados[retomados], axis=1, count=n_casas)
+        pontuacao[retomados] = checkpoint.pontuacao[retomados]
+        comidas[retomados] = checkpoint.comidas[retomados]
+        corretos[:] = np.arange(n_genes) < passo[:, None]
+
+    # estado so dos individuos que ainda andam; as matrizes sao acessadas pelos indices planos das linhas
+    linhas = np.flatnonzero((comidas < limite) & (passo < n_genes))
+    t = passo[linhas]
+    casa = casa_final[linhas]
+    pontos = pontuacao[linhas]
+    batidas = paredes[linhas]
+    pegas = comidas[linhas]
+    genes_planos = genomas.reshape(-1)
+    corretos_planos = corretos.reshape(-1)
+    visitados_planos = visitados.reshape(-1)
+    tabela_plana = tabela.reshape(-1, k)
+    ultimo = n_genes - 1
+
+    while len(linhas):
+        inicio_genes = linhas*n_genes
+        inicio_casas = linhas*n_casas
+
+        # codigo dos proximos k movimentos (genes depois do fim do genoma valem 0 e nao sao usados)
+        codigo = casa*8**k
+        for j in range(k):
+            codigo += genes_planos.take(inicio_genes + np.minimum(t + j, ultimo)).astype(np.int64)*8**(k-1-j)
+        destinos = tabela_plana.take(codigo, axis=0)
+
+        ativo = np.ones(len(linhas), dtype=bool)
+        for j in range(k):
+            destino = destinos[:, j]
+            ativo &= (destino != FORA) & (t + j < n_genes)
+
+            # pontua o movimento
+            bateu = ativo & (destino == casa)
+            andou = ativo & ~bateu
+            destino = np.where(andou, destino, casa)
+            plano = inicio_casas + destino
+            novo = andou & ~visitados_planos.take(plano)
+            pegou = novo & comida.take(destino)
+
+            visitados_planos[plano[novo]] = True
+            batidas += bateu
+            pontos += 3*novo + 7*pegou
+            pegas += pegou
+            corretos_planos[(inicio_genes + t + j)[andou]] = True
+            casa = destino
+
+            # quem pegou comidas suficientes para de andar
+            ativo &= pegas < limite
+        t += k
+
+        # tira do lote quem parou, guardando o resultado
+        if not ativo.all():
+            parados = ~ativo
+            saem = linhas[parados]
+            pontuacao[saem] = pontos[parados]
+            paredes[saem] = batidas[parados]
+            comidas[saem] = pegas[parados]
+            casa_final[saem] = casa[parados]
+            linhas, t, casa, pontos, batidas, pegas = (v[ativo] for v in (linhas, t, casa, pontos, batidas, pegas))
+
+    n_corretos = corretos.sum(axis=1, dtype=np.int32)
+
+    return AvaliacaoLote(pontuacao - paredes, comidas, n_corretos, corretos, visitados, casa_final.astype(np.int32), pontuacao)
+
+
+# motores de avaliacao em lote que podem ser escolhidos em AlgoritmoGenetico
+MOTORES = {'lote': avalia_lote, 'compacto': avalia_compacto}
@@ -0,0 +1,130 @@
+"""Executa o algoritmo genetico em labirintos gerados, para uma matriz de tamanhos de labirinto e de populacao,
+e escreve em json o tempo de cada fase (primeira geracao, elitismo, torneio, crossover, mutacao, avaliacao e
+registro), as geracoes por segundo e o pico de memoria de cada caso. Dois arquivos de resultado podem ser
+comparados para achar regressoes entre versoes.
+
+Uso: python benchmarks/bench_ag.py --dims 10 20 30 --pops 100 500 --geracoes 50 --saida bench.json
+
+Com --ate-solucao, as geracoes de cada caso sao as geracoes ate a solucao, o que compara os operadores
+(--mutacao guiada, --aptidao moldada) com os originais.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labirinto import Labirinto
+from ag import AlgoritmoGenetico, FASES, MUTACOES, APTIDOES
+from registro import RegistroNulo, RegistroTexto, RegistroResumo, RegistroBinario
+from gerador import gera_labirinto, salva_labirinto
+
+REGISTROS = {'nulo': RegistroNulo, 'texto': RegistroTexto, 'resumo': RegistroResumo, 'binario': RegistroBinario}
+
+
+def evolui_fixo(ag: AlgoritmoGenetico, lab: Labirinto) -> None:
+    """Faz exatamente ag.max_geracoes geracoes, sem parar na solucao nem na convergencia, para que a carga
+       de trabalho seja a mesma entre versoes. Cronometra as mesmas fases de AlgoritmoGenetico.fit."""
+    ag.registro.inicia()
+    try:
+        pop = ag.gera_primeira_pop(ag.pop_size, lab)
+        while True:
+            inicio = time.perf_counter()
+            ag.registro.escreve_geracao(ag.geracoes, pop)
+            ag._cronometra('registro', inicio)
+            if ag.geracoes >= ag.max_geracoes:
+                break
+            pop = ag.gera_nova_pop(pop, lab)
+    finally:
+        ag.registro.fecha()
+
+
+def executa(arquivo: str, pop: int, args: argparse.Namespace, pasta: str) -> AlgoritmoGenetico:
+    """Executa o algoritmo genetico uma vez no labirinto do arquivo e retorna o objeto com os tempos."""
+    lab = Labirinto(arquivo)
+    registro = RegistroNulo() if args.registro == 'nulo' else REGISTROS[args.registro](os.path.join(pasta, 'saida'))
+    ag = AlgoritmoGenetico(max_geracoes=args.geracoes, pop_size=pop, registro=registro, seed=args.seed,
+                           mutacao=args.mutacao, aptidao=args.aptidao)
+    if args.ate_solucao:
+        ag.fit(lab)
+    else:
+        evolui_fixo(ag, lab)
+
+    return ag
+
+
+def mede_caso(dim: int, pop: int, args: argparse.Namespace, pasta: str) -> dict:
+    """Mede um caso (tamanho do labirinto, tamanho da populacao) e retorna o resultado."""
+    n_comidas = args.comidas if args.comidas is not None else dim
+    arquivo = os.path.join(pasta, f'labirinto_{dim}.txt')
+    salva_labirinto(gera_labirinto(dim, args.densidade, n_comidas, seed=args.seed), arquivo)
+
+    # a primeira execucao mede os tempos; a segunda, com a mesma semente, mede a memoria (o tracemalloc deixa
+    # tudo mais lento)
+    inicio = time.perf_counter()
+    ag = executa(arquivo, pop, args, pasta)
+    total = time.perf_counter() - inicio
+
+    memoria = None
+    if not args.sem_memoria:
+        tracemalloc.start()
+        executa(arquivo, pop, args, pasta)
+        memoria = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'dim': dim, 'pop': pop, 'densidade': args.densidade, 'comidas': n_comidas, 'seed': args.seed,
+        'geracoes': ag.geracoes, 'resolveu': ag.solucao is not None,
+        'tempo_total': total, 'geracoes_por_segundo': ag.geracoes / total,
+        'tempos': {fase: ag.tempos[fase] for fase in FASES},
+        'cache': ag.estatisticas_cache(),
+        'memoria_pico': memoria,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dims', type=int, nargs='*', default=[10, 20, 30])
+    parser.add_argument('--pops', type=int, nargs='*', default=[100, 500])
+    parser.add_argument('--geracoes', type=int, default=50)
+    parser.add_argument('--densidade', type=float, default=0.3)
+    parser.add_argument('--comidas', type=int, default=None)
+    parser.add_argument('--ate-solucao', action='store_true',
+                        help='usa fit, que para na solucao ou na convergencia (padrao: sempre --geracoes geracoes)')
+    parser.add_argument('--mutacao', choices=MUTACOES, default='aleatoria')
+    parser.add_argument('--aptidao', choices=APTIDOES, default='original')
+    parser.add_argument('--registro', choices=sorted(REGISTROS), default='texto')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sem-memoria', action='store_true', help='nao mede o pico de memoria')
+    parser.add_argument('--saida', default=None, help='arquivo json do resultado (padrao: saida padrao)')
+    args = parser.parse_args()
+
+    casos = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for dim in args.dims:
+            for pop in args.pops:
+                caso = mede_caso(dim, pop, args, pasta)
+                casos.append(caso)
+                print(f'dim={dim} pop={pop} geracoes={caso["geracoes"]} '
+                      f'{caso["geracoes_por_segundo"]:.1f} geracoes/s', file=sys.stderr)
+
+    resultado = {
+        'python': platform.python_version(), 'numpy': np.__version__, 'plataforma': platform.platform(),
+        'nucleos': os.cpu_count(), 'parametros': vars(args), 'casos': casos,
+    }
+    texto = json.dumps(resultado, indent=2)
+    if args.saida is None:
+        print(texto)
+    else:
+        with open(args.saida, 'w') as f:
+            f.write(texto + '\n')
+
+
+if __name__ == '__main__':
+    main()
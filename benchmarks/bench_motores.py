@@ -0,0 +1,110 @@
+"""Compara os motores de avaliacao: a exploracao escalar (Individuo.explora, um individuo por vez), o lote
+mascarado (avalia_lote, todos os individuos a cada passo) e o lote compacto (avalia_compacto, so os individuos
+que ainda andam, de k em k passos), em populacoes onde os individuos param cedo (genomas aleatorios), andam o
+genoma todo (genomas que nunca saem do labirinto) ou uma mistura dos dois. Com --geracoes, compara tambem o
+tempo de avaliacao de execucoes do algoritmo genetico com cada motor, onde os filhos continuam a exploracao
+de checkpoints em passos diferentes.
+
+Uso: python benchmarks/bench_motores.py --dims 10 20 30 --pop 200
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labirinto import Labirinto
+from individuo import Individuo
+from avaliacao import avalia_lote, avalia_compacto, MOTORES
+from ag import AlgoritmoGenetico
+from registro import RegistroNulo
+from gerador import gera_labirinto
+from bench_visitados import movimentos_dentro
+
+
+def gera_genomas(lab: Labirinto, tipo: str, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Gera n genomas aleatorios, que andam o genoma todo ('longos') ou metade de cada ('misto')."""
+    genomas = rng.integers(0, 8, (n, lab.tamanho_genoma), dtype=np.uint8)
+    n_longos = {'aleatorios': 0, 'longos': n, 'misto': n // 2}[tipo]
+    for i in range(n_longos):
+        genomas[i] = movimentos_dentro(lab, lab.tamanho_genoma, rng)
+
+    return genomas
+
+
+def mede(avalia, repeticoes: int) -> tuple:
+    """Retorna o menor tempo, em segundos, de varias execucoes e o resultado da ultima."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = avalia()
+        tempos.append(time.perf_counter() - inicio)
+
+    return min(tempos), resultado
+
+
+def escalar(genomas: np.ndarray, lab: Labirinto) -> np.ndarray:
+    """Avalia os genomas um por vez com Individuo.explora e retorna as pontuacoes."""
+    pontuacoes = []
+    ind = Individuo()
+    for genoma in genomas:
+        ind.movimentos = genoma.tolist()
+        ind.explora(lab)
+        pontuacoes.append(ind.pontuacao)
+
+    return np.array(pontuacoes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dims', type=int, nargs='*', default=[10, 20, 30])
+    parser.add_argument('--pop', type=int, default=200)
+    parser.add_argument('--tipos', nargs='*', default=['aleatorios', 'misto', 'longos'])
+    parser.add_argument('--ks', type=int, nargs='*', default=[1, 2, 3])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--geracoes', type=int, default=0, help='geracoes das execucoes do algoritmo genetico (0 = nao executa)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    motores = ['escalar', 'lote'] + [f'compacto k={k}' for k in args.ks]
+    print(f'pop={args.pop}, tempo em ms por populacao')
+    print(f'{"dim":>4} {"tipo":>10} ' + ' '.join(f'{m:>13}' for m in motores) + f' {"vencedor":>13}')
+    for dim in args.dims:
+        # poucas comidas para que os individuos longos andem o genoma todo
+        lab = Labirinto.de_matriz(gera_labirinto(dim, densidade=0.2, n_comidas=2, seed=args.seed))
+        for k in args.ks:
+            lab.transicoes_passos(k)
+
+        for tipo in args.tipos:
+            genomas = gera_genomas(lab, tipo, args.pop, rng)
+            tempos = {}
+            tempos['escalar'], referencia = mede(lambda: escalar(genomas, lab), 1)
+            tempos['lote'], resultado = mede(lambda: avalia_lote(genomas, lab), args.repeticoes)
+            assert np.array_equal(resultado.pontuacao, referencia)
+            for k in args.ks:
+                tempos[f'compacto k={k}'], resultado = mede(lambda: avalia_compacto(genomas, lab, k=k), args.repeticoes)
+                assert np.array_equal(resultado.pontuacao, referencia)
+
+            vencedor = min(tempos, key=tempos.get)
+            print(f'{dim:>4} {tipo:>10} ' + ' '.join(f'{1000*tempos[m]:13.2f}' for m in motores) + f' {vencedor:>13}')
+
+    if args.geracoes > 0:
+        print(f'\nalgoritmo genetico: pop={args.pop}, ate {args.geracoes} geracoes, tempo de avaliacao em ms')
+        print(f'{"dim":>4} {"geracoes":>9} ' + ' '.join(f'{m:>13}' for m in MOTORES) + f' {"vencedor":>13}')
+        for dim in args.dims:
+            lab = Labirinto.de_matriz(gera_labirinto(dim, seed=args.seed))
+            tempos = {}
+            for motor in MOTORES:
+                ag = AlgoritmoGenetico(max_geracoes=args.geracoes, pop_size=args.pop, registro=RegistroNulo(),
+                                       seed=args.seed, memoria_cache=0, motor=motor)
+                ag.fit(lab)
+                tempos[motor] = ag.tempos['avaliacao']
+            vencedor = min(tempos, key=tempos.get)
+            print(f'{dim:>4} {ag.geracoes:>9} ' + ' '.join(f'{1000*tempos[m]:13.2f}' for m in MOTORES) + f' {vencedor:>13}')
+
+
+if __name__ == '__main__':
+    main()
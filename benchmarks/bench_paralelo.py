@@ -0,0 +1,61 @@
+"""Mede o ganho da avaliacao paralela em relacao a quantidade de processos.
+
+Uso: python benchmarks/bench_paralelo.py --dim 30 --pop 2000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labirinto import Labirinto
+from populacao import Populacao
+from paralelo import AvaliadorParalelo
+from gerador import gera_labirinto
+
+
+def mede(avalia, pop: Populacao, repeticoes: int) -> float:
+    """Retorna o menor tempo, em segundos, de varias avaliacoes da populacao."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        avalia(pop)
+        tempos.append(time.perf_counter() - inicio)
+
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dim', type=int, default=30)
+    parser.add_argument('--pop', type=int, default=2000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--jobs', type=int, nargs='*', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    lab = Labirinto.de_matriz(gera_labirinto(args.dim, seed=args.seed))
+    rng = np.random.default_rng(args.seed)
+    pop = Populacao(args.pop, args.dim**2*3)
+    pop.genomas[:] = rng.integers(0, 8, pop.genomas.shape)
+
+    # referencia: avaliacao no proprio processo
+    serial = mede(lambda p: p.avalia(lab), pop, args.repeticoes)
+    referencia = (pop.pontuacao.copy(), pop.comidas.copy(), pop.corretos.copy())
+    print(f'dim={args.dim} pop={args.pop} nucleos={os.cpu_count()}')
+    print(f'{"n_jobs":>6} {"tempo (s)":>10} {"ganho":>7} {"igual":>6}')
+    print(f'{"serial":>6} {serial:10.4f} {1.0:7.2f} {"sim":>6}')
+
+    jobs = args.jobs or sorted({2**i for i in range(os.cpu_count().bit_length())} | {os.cpu_count()})
+    for n_jobs in jobs:
+        with AvaliadorParalelo(lab, args.pop, pop.n_genes, n_jobs) as avaliador:
+            pop.pontuacao[:] = 0
+            tempo = mede(avaliador.avalia, pop, args.repeticoes)
+        igual = all(np.array_equal(a, b) for a, b in zip(referencia, (pop.pontuacao, pop.comidas, pop.corretos)))
+        print(f'{n_jobs:>6} {tempo:10.4f} {serial/tempo:7.2f} {"sim" if igual else "NAO":>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Compara a exploracao escalar com a busca em lista (O(tamanho do caminho) por passo) e com o mapa de
+casas visitadas (O(1) por passo) em labirintos gerados de tamanhos crescentes.
+
+Uso: python benchmarks/bench_visitados.py --dims 10 20 40 80
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from labirinto import Labirinto
+from individuo import Individuo
+from gerador import gera_labirinto, VIZINHOS
+
+
+class IndividuoLista(Individuo):
+    """Individuo com a pontuacao antiga: procura a casa na lista de posicoes e a comida na lista de comidas."""
+
+    def explora(self, lab: Labirinto) -> None:
+        posicoes = [lab.pos_inicial]
+        pos_anterior = lab.pos_inicial
+        pontuacao = comidas = 0
+        for movimento in self.movimentos:
+            if comidas >= lab.limite_comidas:
+                break
+            nova_pos = self.anda(lab, movimento, pos_anterior)
+            if nova_pos == (np.nan, np.nan):
+                break
+            if nova_pos == pos_anterior:
+                pontos = -1
+            elif nova_pos in posicoes:
+                pontos = 0
+            else:
+                pontos = 10 if nova_pos in lab.pos_comidas else 3
+                posicoes.append(nova_pos)
+                comidas += pontos == 10
+            pontuacao += pontos
+            pos_anterior = nova_pos
+        self.pontuacao = pontuacao
+        self.comidas = comidas
+
+
+def movimentos_dentro(lab: Labirinto, n: int, rng: np.random.Generator) -> list:
+    """Sorteia n movimentos que nunca saem do labirinto, para que o caminho percorrido seja longo."""
+    movimentos = []
+    lin, col = lab.pos_inicial
+    for _ in range(n):
+        while True:
+            movimento = int(rng.integers(8))
+            l, c = lin + VIZINHOS[movimento][0], col + VIZINHOS[movimento][1]
+            if 0 <= l < lab.n_linhas and 0 <= c < lab.n_colunas:
+                break
+        if lab.caminho[l, c] != 1:
+            lin, col = l, c
+        movimentos.append(movimento)
+
+    return movimentos
+
+
+def mede(classe, lab: Labirinto, genomas: list) -> tuple:
+    """Retorna o tempo medio por individuo e as pontuacoes."""
+    inicio = time.perf_counter()
+    pontuacoes = []
+    for movimentos in genomas:
+        ind = classe()
+        ind.movimentos = movimentos
+        ind.explora(lab)
+        pontuacoes.append(ind.pontuacao)
+
+    return (time.perf_counter() - inicio)/len(genomas), pontuacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dims', type=int, nargs='*', default=[10, 20, 40, 80])
+    parser.add_argument('--individuos', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f'{"dim":>5} {"passos":>7} {"lista (ms)":>11} {"mapa (ms)":>10} {"ganho":>7}')
+    for dim in args.dims:
+        # poucas comidas para que os individuos andem o genoma todo
+        lab = Labirinto.de_matriz(gera_labirinto(dim, densidade=0.2, n_comidas=2, seed=args.seed))
+        genomas = [movimentos_dentro(lab, dim**2*3, rng) for _ in range(args.individuos)]
+        t_lista, p_lista = mede(IndividuoLista, lab, genomas)
+        t_mapa, p_mapa = mede(Individuo, lab, genomas)
+        assert p_lista == p_mapa
+        print(f'{dim:>5} {dim**2*3:>7} {1000*t_lista:11.2f} {1000*t_mapa:10.2f} {t_lista/t_mapa:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
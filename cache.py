@@ -0,0 +1,103 @@
+from populacao import Populacao
+from genoma import empacota, desempacota, tamanho_empacotado
+from collections import OrderedDict
+import numpy as np
+import hashlib
+
+# resultados escalares da avaliacao guardados para cada genoma, com os nomes dos vetores de Populacao
+ESCALARES = ('pontuacao', 'comidas', 'n_corretos', 'posicao', 'pontuacao_corretos')
+
+
+class CacheAvaliacao:
+
+    def __init__(self, max_bytes: int = 64 << 20) -> None:
+        """Inicializa um cache limitado (LRU) com o resultado da avaliacao de genomas em um labirinto, indexado
+           pelo hash do genoma. Um genoma repetido (o mesmo elite, filhos iguais de pais iguais) custa uma
+           consulta em vez de uma exploracao. O resultado eh exato, entao usar o cache nao muda a execucao.
+           Os movimentos corretos ficam empacotados com 3 bits por movimento (ver o modulo 'genoma'), entao
+           cabem quase 3 vezes mais resultados na mesma memoria.
+
+        Args:
+            max_bytes (int, optional): Memoria aproximada maxima dos resultados guardados. Defaults to 64 MB.
+        """
+        self.max_bytes = max_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._capacidade = None
+
+
+    @staticmethod
+    def chaves(genomas: np.ndarray) -> list:
+        """Retorna o hash (16 bytes) de cada genoma."""
+        return [hashlib.blake2b(genoma, digest_size=16).digest() for genoma in np.ascontiguousarray(genomas)]
+
+
+    def consulta(self, chaves: list) -> tuple:
+        """Procura os genomas no cache e entre eles mesmos (so o primeiro de genomas iguais precisa ser avaliado).
+
+        Args:
+            chaves (list): Hash de cada genoma (ver chaves).
+
+        Returns:
+            tuple: Linhas achadas no cache e os resultados delas; linhas repetidas e a primeira linha igual a cada uma.
+        """
+        achadas, resultados, repetidas, primeiras = [], [], [], []
+        vistas = {}
+        for i, chave in enumerate(chaves):
+            resultado = self._itens.get(chave)
+            if resultado is not None:
+                self._itens.move_to_end(chave)
+                achadas.append(i)
+                resultados.append(resultado)
+            elif chave in vistas:
+                repetidas.append(i)
+                primeiras.append(vistas[chave])
+            else:
+                vistas[chave] = i
+        self.acertos += len(achadas) + len(repetidas)
+        self.falhas += len(vistas)
+
+        return np.array(achadas, dtype=np.intp), resultados, np.array(repetidas, dtype=np.intp), np.array(primeiras, dtype=np.intp)
+
+
+    def restaura(self, pop: Populacao, linhas: np.ndarray, resultados: list) -> None:
+        """Coloca nas linhas da populacao os resultados achados no cache."""
+        if len(linhas) == 0:
+            return
+        pop.alteracoes += 1
+        escalares = np.array([resultado[0] for resultado in resultados], dtype=np.int32)
+        for j, nome in enumerate(ESCALARES):
+            getattr(pop, nome)[linhas] = escalares[:, j]
+        pop.corretos[linhas] = desempacota(np.stack([resultado[1] for resultado in resultados]), pop.n_genes)
+        pop.visitados[linhas] = np.stack([resultado[2] for resultado in resultados])
+
+
+    def guarda(self, pop: Populacao, chaves: list, linhas: np.ndarray) -> None:
+        """Guarda no cache o resultado das linhas indicadas da populacao, descartando os usados ha mais tempo
+           quando o cache fica cheio."""
+        if self._capacidade is None:
+            por_item = tamanho_empacotado(pop.n_genes) + pop.visitados.shape[1] + 4*len(ESCALARES) + 200
+            self._capacidade = max(1, self.max_bytes // por_item)
+
+        escalares = np.stack([getattr(pop, nome)[linhas] for nome in ESCALARES], axis=1)
+        corretos = empacota(pop.corretos[linhas])
+        visitados = pop.visitados[linhas]
+        for j, i in enumerate(linhas):
+            self._itens[chaves[i]] = (escalares[j], corretos[j], visitados[j])
+            self._itens.move_to_end(chaves[i])
+        while len(self._itens) > self._capacidade:
+            self._itens.popitem(last=False)
+
+
+    def taxa_acertos(self) -> float:
+        """Fracao das consultas resolvidas sem avaliar o genoma."""
+        total = self.acertos + self.falhas
+        return self.acertos / total if total else 0.0
+
+
+    def limpa(self) -> None:
+        """Esvazia o cache e zera os contadores (por exemplo, ao trocar de labirinto)."""
+        self._itens.clear()
+        self._capacidade = None
+        self.acertos = self.falhas = 0
@@ -0,0 +1,59 @@
+import numpy as np
+import struct
+import json
+import os
+
+# cabecalho do arquivo de estado: assinatura, tamanho da descricao em json e a descricao
+ASSINATURA = b'AGEST01\n'
+TAMANHO = struct.Struct('<I')
+
+
+def salva_estado(arquivo: str, info: dict, vetores: dict) -> None:
+    """Escreve um estado da execucao em um arquivo binario: um cabecalho json com as informacoes e a forma de
+       cada vetor, seguido dos bytes dos vetores. O arquivo eh escrito em um temporario e so entao renomeado,
+       entao uma interrupcao no meio da escrita nunca deixa um estado pela metade.
+
+    Args:
+        arquivo (str): Nome do arquivo de estado.
+        info (dict): Informacoes serializaveis em json (parametros, geracao, estado do gerador aleatorio...).
+        vetores (dict): Vetores do numpy guardados, pelo nome.
+    """
+    vetores = {nome: np.ascontiguousarray(vetor) for nome, vetor in vetores.items()}
+    cabecalho = json.dumps({'info': info, 'vetores': [[nome, vetor.dtype.str, vetor.shape] for nome, vetor in vetores.items()]}).encode()
+
+    temporario = f'{arquivo}.{os.getpid()}.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(ASSINATURA)
+        f.write(TAMANHO.pack(len(cabecalho)))
+        f.write(cabecalho)
+        for vetor in vetores.values():
+            f.write(vetor.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, arquivo)
+
+
+def carrega_estado(arquivo: str) -> tuple:
+    """Le um arquivo escrito por salva_estado.
+
+    Args:
+        arquivo (str): Nome do arquivo de estado.
+
+    Returns:
+        tuple: As informacoes (dict) e os vetores (dict de np.ndarray).
+    """
+    with open(arquivo, 'rb') as f:
+        if f.read(len(ASSINATURA)) != ASSINATURA:
+            raise ValueError(f'{arquivo} nao eh um estado do algoritmo genetico')
+        cabecalho = json.loads(f.read(TAMANHO.unpack(f.read(TAMANHO.size))[0]))
+
+        vetores = {}
+        for nome, tipo, forma in cabecalho['vetores']:
+            tipo = np.dtype(tipo)
+            n_bytes = int(np.prod(forma))*tipo.itemsize
+            dados = f.read(n_bytes)
+            if len(dados) != n_bytes:
+                raise ValueError(f'{arquivo} esta incompleto')
+            vetores[nome] = np.frombuffer(dados, dtype=tipo).reshape(forma).copy()
+
+    return cabecalho['info'], vetores
@@ -0,0 +1,88 @@
+import numpy as np
+
+# cada movimento (0 a 7) ocupa 3 bits, entao cada grupo de 8 movimentos cabe em 3 bytes
+BITS = 3
+_GRUPO = 8
+_DESLOCAMENTOS = np.arange(_GRUPO - 1, -1, -1, dtype=np.uint32)*BITS
+
+
+def tamanho_empacotado(n_genes: int) -> int:
+    """Quantidade de bytes de um genoma de n_genes movimentos empacotado."""
+    return (n_genes*BITS + 7) // 8
+
+
+def empacota(genomas: np.ndarray) -> np.ndarray:
+    """Empacota genomas com 3 bits por movimento: o movimento i ocupa os bits 3i a 3i+2 da sequencia de bits
+       (o bit mais significativo de cada byte primeiro, como np.packbits). Cada grupo de 8 movimentos vira um
+       inteiro de 24 bits, escrito em 3 bytes, entao o custo eh de algumas operacoes por grupo.
+
+    Args:
+        genomas (np.ndarray): Genoma (n_genes,) ou genomas (n, n_genes) com movimentos de 0 a 7.
+
+    Returns:
+        np.ndarray: Vetor uint8 (..., tamanho_empacotado(n_genes)).
+    """
+    genomas = np.asarray(genomas)
+    *forma, n_genes = genomas.shape
+    n_grupos = -(-n_genes // _GRUPO)
+
+    # completa com zeros ate um grupo inteiro
+    grupos = np.zeros((*forma, n_grupos*_GRUPO), dtype=np.uint32)
+    grupos[..., :n_genes] = genomas
+    grupos = grupos.reshape(*forma, n_grupos, _GRUPO)
+    valores = np.bitwise_or.reduce(grupos << _DESLOCAMENTOS, axis=-1)
+
+    # os 3 bytes menos significativos de cada valor, do mais significativo para o menos
+    bytes_ = np.stack([valores >> 16, valores >> 8, valores], axis=-1).astype(np.uint8)
+
+    return bytes_.reshape(*forma, 3*n_grupos)[..., :tamanho_empacotado(n_genes)]
+
+
+def desempacota(empacotados: np.ndarray, n_genes: int) -> np.ndarray:
+    """Desfaz empacota.
+
+    Args:
+        empacotados (np.ndarray | bytes): Genoma ou genomas empacotados.
+        n_genes (int): Quantidade de movimentos de cada genoma.
+
+    Returns:
+        np.ndarray: Genomas uint8 (..., n_genes).
+    """
+    if isinstance(empacotados, (bytes, bytearray, memoryview)):
+        empacotados = np.frombuffer(empacotados, dtype=np.uint8)
+    *forma, n_bytes = empacotados.shape
+    if n_bytes != tamanho_empacotado(n_genes):
+        raise ValueError(f'{n_bytes} bytes nao correspondem a {n_genes} movimentos empacotados')
+
+    return _desempacota_grupos(empacotados, forma)[..., :n_genes]
+
+
+def fatia(empacotados: np.ndarray, inicio: int, fim: int) -> np.ndarray:
+    """Retorna os movimentos [inicio, fim) de genomas empacotados (por exemplo, o trecho depois de um ponto de
+       crossover), desempacotando so os grupos de 8 movimentos que contem o trecho."""
+    if isinstance(empacotados, (bytes, bytearray, memoryview)):
+        empacotados = np.frombuffer(empacotados, dtype=np.uint8)
+    *forma, n_bytes = empacotados.shape
+    if not 0 <= inicio <= fim or tamanho_empacotado(fim) > n_bytes:
+        raise IndexError(f'Trecho [{inicio}, {fim}) fora do genoma')
+
+    primeiro = inicio // _GRUPO
+    trecho = empacotados[..., 3*primeiro:3*(-(-fim // _GRUPO))]
+    deslocamento = inicio - primeiro*_GRUPO
+
+    return _desempacota_grupos(trecho, forma)[..., deslocamento:deslocamento + fim - inicio]
+
+
+def _desempacota_grupos(empacotados: np.ndarray, forma: list) -> np.ndarray:
+    """Desempacota todos os grupos de 8 movimentos (o ultimo pode estar incompleto) em um vetor uint8."""
+    n_bytes = empacotados.shape[-1]
+    n_grupos = -(-n_bytes // 3)
+
+    # completa com zeros ate 3 bytes por grupo
+    completos = np.zeros((*forma, 3*n_grupos), dtype=np.uint32)
+    completos[..., :n_bytes] = empacotados
+    completos = completos.reshape(*forma, n_grupos, 3)
+    valores = (completos[..., 0] << 16) | (completos[..., 1] << 8) | completos[..., 2]
+    genes = (valores[..., None] >> _DESLOCAMENTOS) & 7
+
+    return genes.astype(np.uint8).reshape(*forma, n_grupos*_GRUPO)
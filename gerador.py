@@ -0,0 +1,65 @@
+from labirinto import salva_labirinto_texto
+import numpy as np
+
+# os 8 vizinhos de uma casa, os mesmos movimentos de Individuo._movimenta
+VIZINHOS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def gera_labirinto(dim: int, densidade: float = 0.3, n_comidas: int = None, seed: int = None) -> np.ndarray:
+    """Gera um labirinto aleatorio dim x dim com solucao: todas as comidas podem ser alcancadas a partir
+       da entrada, que fica no canto superior esquerdo.
+
+    Args:
+        dim (int): Dimensao do labirinto.
+        densidade (float, optional): Proporcao aproximada de paredes. Defaults to 0.3.
+        n_comidas (int, optional): Quantidade de comidas. Defaults to dim.
+        seed (int, optional): Semente do gerador aleatorio. Defaults to None.
+
+    Returns:
+        np.ndarray: Matriz do labirinto (-1 = entrada, 0 = livre, 1 = parede, 2 = comida).
+    """
+    rng = np.random.default_rng(seed)
+    if n_comidas is None:
+        n_comidas = dim
+
+    caminho = (rng.random((dim, dim)) < densidade).astype(np.int64)
+
+    # abre um caminho aleatorio a partir da entrada para garantir espaco para as comidas
+    lin, col = 0, 0
+    caminho[lin, col] = 0
+    while np.count_nonzero(alcancaveis(caminho, (0, 0))) < min(dim*dim, 2*n_comidas + 1):
+        for d in rng.integers(8, size=dim):
+            lin = min(max(lin + VIZINHOS[d][0], 0), dim-1)
+            col = min(max(col + VIZINHOS[d][1], 0), dim-1)
+            caminho[lin, col] = 0
+
+    # coloca as comidas em casas alcancaveis
+    livres = np.flatnonzero(alcancaveis(caminho, (0, 0)).ravel()[1:]) + 1
+    comidas = rng.choice(livres, size=min(n_comidas, len(livres)), replace=False)
+    caminho.ravel()[comidas] = 2
+    caminho[0, 0] = -1
+
+    return caminho
+
+
+def alcancaveis(caminho: np.ndarray, inicio: tuple) -> np.ndarray:
+    """Marca as casas que podem ser alcancadas a partir de inicio sem atravessar paredes."""
+    n_linhas, n_colunas = caminho.shape
+    marcadas = np.zeros(caminho.shape, dtype=bool)
+    marcadas[inicio] = True
+    pilha = [inicio]
+
+    while pilha:
+        lin, col = pilha.pop()
+        for d_lin, d_col in VIZINHOS:
+            l, c = lin + d_lin, col + d_col
+            if 0 <= l < n_linhas and 0 <= c < n_colunas and not marcadas[l, c] and caminho[l, c] != 1:
+                marcadas[l, c] = True
+                pilha.append((l, c))
+
+    return marcadas
+
+
+def salva_labirinto(caminho: np.ndarray, arquivo: str) -> None:
+    """Escreve um labirinto no formato de texto lido por Labirinto."""
+    salva_labirinto_texto(caminho, arquivo)
@@ -0,0 +1,204 @@
+from labirinto import Labirinto
+from individuo import Individuo
+from populacao import Populacao
+from ag import AlgoritmoGenetico
+from selecao import k_melhores, k_piores
+from genoma import empacota, desempacota
+import multiprocessing as mp
+import numpy as np
+import traceback
+import queue
+
+
+def _evolui_ilha(indice: int, n_ilhas: int, caminho: np.ndarray, parametros: dict, config: dict,
+                 semente: np.random.SeedSequence, caixas: list, parar, resultados) -> None:
+    """Evolui uma sub-populacao em um processo proprio, trocando migrantes com as outras ilhas a cada
+       config['intervalo'] geracoes, ate alguma ilha achar a solucao ou atingir o maximo de geracoes."""
+    # migrantes que ficarem sem destinatario podem ser descartados quando a ilha termina
+    for caixa in caixas:
+        caixa.cancel_join_thread()
+
+    # qualquer erro volta para o processo principal, que senao esperaria o resultado desta ilha para sempre
+    try:
+        geracoes, movimentos = _evolui(indice, n_ilhas, caminho, parametros, config, semente, caixas, parar)
+    except Exception:
+        resultados.put((indice, None, None, traceback.format_exc()))
+        return
+    resultados.put((indice, geracoes, movimentos, None))
+
+
+def _evolui(indice: int, n_ilhas: int, caminho: np.ndarray, parametros: dict, config: dict,
+            semente: np.random.SeedSequence, caixas: list, parar) -> tuple:
+    """Corpo de _evolui_ilha. Retorna as geracoes feitas e os movimentos da solucao (ou None)."""
+    # cada ilha tem uma sequencia aleatoria propria, filha da semente do modelo
+    lab = Labirinto.de_matriz(caminho)
+    ag = AlgoritmoGenetico(**parametros, seed=semente)
+    pop = ag.gera_primeira_pop(ag.pop_size, lab)
+    solucao = ag._procura_solucao(pop, lab)
+
+    while solucao is None and ag.geracoes < ag.max_geracoes and not parar.is_set():
+        pop = ag.gera_nova_pop(pop, lab)
+        solucao = ag._procura_solucao(pop, lab)
+
+        if solucao is None and ag.geracoes % config['intervalo'] == 0:
+            _migra(ag, pop, lab, indice, n_ilhas, config, caixas)
+
+    if solucao is not None:
+        parar.set()
+        return ag.geracoes, solucao.movimentos.tolist()
+    return ag.geracoes, None
+
+
+def _migra(ag: AlgoritmoGenetico, pop: Populacao, lab: Labirinto, indice: int, n_ilhas: int, config: dict, caixas: list) -> None:
+    """Envia migrantes para a proxima ilha da topologia e coloca na populacao os migrantes que chegaram. So os
+       genomas viajam, empacotados com 3 bits por movimento (ver o modulo 'genoma'); a avaliacao eh
+       deterministica, entao a ilha que recebe reavalia os migrantes em vez de receber a avaliacao."""
+    n = min(config['n_migrantes'], len(pop))
+    rng = ag.rng
+
+    # escolhe quem emigra
+    if config['politica'] == 'melhores':
+        emigrantes = k_melhores(pop.pontuacao, n)
+    else:
+        emigrantes = rng.choice(len(pop), n, replace=False)
+
+    # escolhe o destino
+    if config['topologia'] == 'anel':
+        destino = (indice + 1) % n_ilhas
+    else:
+        destino = (indice + 1 + int(rng.integers(n_ilhas - 1))) % n_ilhas
+    caixas[destino].put(empacota(pop.genomas[emigrantes]))
+
+    # recebe quem chegou, sem esperar pelas outras ilhas
+    while True:
+        try:
+            empacotados = caixas[indice].get_nowait()
+        except queue.Empty:
+            break
+        m = min(len(empacotados), len(pop))
+        if config['substituicao'] == 'piores':
+            substituidos = k_piores(pop.pontuacao, m)
+        else:
+            substituidos = rng.choice(len(pop), m, replace=False)
+        imigrantes = Populacao(m, pop.n_genes)
+        imigrantes.genomas[:] = desempacota(empacotados[:m], pop.n_genes)
+        imigrantes.avalia(lab, motor=ag.motor)
+        ag._molda(imigrantes, lab)
+        ag.avaliacoes += m
+        pop.substitui(substituidos, imigrantes)
+
+
+class ModeloIlhas:
+
+    def __init__(self, n_ilhas: int = 4, intervalo: int = 10, n_migrantes: int = 2, topologia: str = 'anel',
+                 politica: str = 'melhores', substituicao: str = 'piores', seed: int = None, **parametros) -> None:
+        """Inicializa o modelo de ilhas: n_ilhas sub-populacoes evoluem em processos separados com os operadores
+           de AlgoritmoGenetico.gera_nova_pop e trocam individuos a cada intervalo geracoes. A convergencia de
+           uma ilha nao a para, porque os migrantes trazem diversidade de volta.
+
+        Args:
+            n_ilhas (int, optional): Quantidade de ilhas (processos). Defaults to 4.
+            intervalo (int, optional): Quantidade de geracoes entre migracoes. Defaults to 10.
+            n_migrantes (int, optional): Quantidade de individuos enviados em cada migracao. Defaults to 2.
+            topologia (str, optional): 'anel' (envia para a proxima ilha) ou 'aleatoria' (para uma ilha sorteada). Defaults to 'anel'.
+            politica (str, optional): Quem emigra: 'melhores' ou 'aleatorios'. Defaults to 'melhores'.
+            substituicao (str, optional): Quem os imigrantes substituem: 'piores' ou 'aleatorios'. Defaults to 'piores'.
+            seed (int, optional): Semente do modelo; cada ilha usa uma semente filha independente. Defaults to None.
+            **parametros: Parametros de AlgoritmoGenetico usados em cada ilha (pop_size eh o tamanho de cada ilha).
+        """
+        if topologia not in ('anel', 'aleatoria'):
+            raise ValueError(f'Topologia desconhecida: {topologia}')
+        if politica not in ('melhores', 'aleatorios') or substituicao not in ('piores', 'aleatorios'):
+            raise ValueError('politica deve ser melhores/aleatorios e substituicao piores/aleatorios')
+
+        # parametros invalidos falham aqui, e nao dentro dos processos das ilhas
+        AlgoritmoGenetico(**parametros)
+
+        self.n_ilhas = n_ilhas
+        self.parametros = parametros
+        self.config = {'intervalo': intervalo, 'n_migrantes': n_migrantes, 'topologia': topologia,
+                       'politica': politica, 'substituicao': substituicao, 'seed': seed}
+        self.solucao = None
+        self.geracoes = {}
+
+
+    def fit(self, lab: Labirinto, arquivo: str = 'saida.txt') -> Individuo:
+        """Evolui todas as ilhas ate uma delas achar a solucao, que eh escrita no arquivo de saida. As outras
+           ilhas param assim que a solucao aparece.
+
+        Args:
+            lab (Labirinto): Labirinto que se deseja pegar todos as comidas.
+            arquivo (str, optional): Arquivo onde a solucao eh escrita. Defaults to 'saida.txt'.
+
+        Returns:
+            Individuo: Solucao encontrada, ou None se nenhuma ilha encontrou.
+        """
+        caixas = [mp.Queue() for _ in range(self.n_ilhas)]
+        parar = mp.Event()
+        resultados = mp.Queue()
+
+        sementes = np.random.SeedSequence(self.config['seed']).spawn(self.n_ilhas)
+        processos = [mp.Process(target=_evolui_ilha, args=(i, self.n_ilhas, lab.caminho, self.parametros, self.config,
+                                                           sementes[i], caixas, parar, resultados))
+                     for i in range(self.n_ilhas)]
+        for processo in processos:
+            processo.start()
+
+        # espera o resultado de todas as ilhas
+        ilha_solucao = None
+        try:
+            for indice, geracoes, movimentos in self._espera_resultados(processos, resultados):
+                self.geracoes[indice] = geracoes
+                if movimentos is not None and self.solucao is None:
+                    self.solucao = Individuo()
+                    self.solucao.movimentos = movimentos
+                    ilha_solucao = indice
+        except BaseException:
+            # uma ilha falhou: as outras sao encerradas em vez de esperadas
+            parar.set()
+            for processo in processos:
+                processo.terminate()
+            raise
+        finally:
+            for processo in processos:
+                processo.join()
+
+        if self.solucao is not None:
+            ag = AlgoritmoGenetico(**self.parametros)
+            ag.geracoes = self.geracoes[ilha_solucao]
+            open(arquivo, 'w').close()
+            ag.escreve_solucao(self.solucao, arquivo, lab)
+
+        return self.solucao
+
+
+    @staticmethod
+    def _espera_resultados(processos: list, resultados, intervalo: float = 1.0):
+        """Gera o (indice, geracoes, movimentos) de cada ilha assim que chega. Levanta RuntimeError se uma ilha
+           falhou (com o traceback dela) ou terminou sem mandar resultado (por exemplo, morta pelo sistema).
+
+        Args:
+            processos (list): Processo de cada ilha.
+            resultados (mp.Queue): Fila onde as ilhas mandam o resultado.
+            intervalo (float, optional): Tempo (s) entre duas verificacoes dos processos. Defaults to 1.0.
+        """
+        pendentes = set(range(len(processos)))
+        sem_resultado = set()
+        while pendentes:
+            try:
+                indice, geracoes, movimentos, erro = resultados.get(timeout=intervalo)
+            except queue.Empty:
+                # uma ilha que terminou bem ja mandou o resultado, que pode so estar atrasado na fila: ela tem
+                # mais um intervalo para aparecer
+                for i in sorted(pendentes):
+                    codigo = processos[i].exitcode
+                    if codigo is not None and (codigo != 0 or i in sem_resultado):
+                        raise RuntimeError(f'A ilha {i} terminou (codigo {codigo}) sem mandar o resultado')
+                    if codigo is not None:
+                        sem_resultado.add(i)
+                continue
+
+            if erro is not None:
+                raise RuntimeError(f'A ilha {indice} falhou:\n{erro}')
+            pendentes.discard(indice)
+            yield indice, geracoes, movimentos
@@ -1,25 +1,143 @@
-import random
-from labirinto import Labirinto
+from labirinto import Labirinto, FORA
+from avaliacao import Checkpoint
 import numpy as np
 
+
+def _lista(movimentos) -> list:
+    """Copia movimentos (lista ou linha de genomas) para uma lista de int."""
+    if isinstance(movimentos, np.ndarray):
+        return movimentos.tolist()
+    return list(movimentos)
+
+
 class Individuo:
 
-    def __init__(self) -> None:
-        """Inicializa o objeto individuo."""        
-        self.movimentos = []
-        self.movimentos_corretos = []
+    def __init__(self, populacao=None, indice: int = 0) -> None:
+        """Inicializa o objeto individuo. Se receber uma populacao, o individuo eh apenas uma visao
+           da linha indice dela e todos os dados sao lidos e escritos nos vetores da populacao.
+
+        Args:
+            populacao (Populacao, optional): Populacao que guarda os dados do individuo. Defaults to None.
+            indice (int, optional): Linha do individuo na populacao. Defaults to 0.
+        """        
+        self._pop = populacao
+        self._i = indice
+        if populacao is None:
+            self._movimentos = []
+            self._movimentos_corretos = []
+            self._pontuacao = 0
+            self._comidas = 0
+            self._checkpoint = None
         self.posicoes_percorridas = []
-        self.pontuacao = 0
-        self.comidas = 0
-    
 
-    def gera_movimentos(self, x: int = 10) -> None:
-        """Gera uma sequencia de x movimentos aleatorios para um individuo.
+
+    @property
+    def movimentos(self) -> list:
+        """Lista com os movimentos do individuo. Em uma populacao, eh a linha dele em genomas (np.ndarray uint8):
+           escrever nela (ind.movimentos[k] = m) altera a populacao, mas o tamanho eh fixo, entao nao ha append.
+           Para mudar o tamanho, atribua uma sequencia nova (ind.movimentos = [...]), do tamanho do genoma."""
+        if self._pop is None:
+            return self._movimentos
+        return self._pop.genomas[self._i]
+
+
+    @movimentos.setter
+    def movimentos(self, movimentos: list) -> None:
+        if self._pop is None:
+            self._movimentos = movimentos
+        else:
+            self._pop.genomas[self._i] = movimentos
+
+
+    @property
+    def movimentos_corretos(self) -> list:
+        """Lista com os movimentos que nao bateram em parede nem sairam do labirinto."""
+        if self._pop is None:
+            return self._movimentos_corretos
+        return self._pop.corretos[self._i, :self._pop.n_corretos[self._i]].tolist()
+
+
+    @movimentos_corretos.setter
+    def movimentos_corretos(self, movimentos: list) -> None:
+        if self._pop is None:
+            self._movimentos_corretos = movimentos
+        else:
+            self._pop.corretos[self._i, :len(movimentos)] = movimentos
+            self._pop.corretos[self._i, len(movimentos):] = 0
+            self._pop.n_corretos[self._i] = len(movimentos)
+
+
+    @property
+    def pontuacao(self) -> int:
+        """Pontuacao total do individuo."""
+        if self._pop is None:
+            return self._pontuacao
+        return int(self._pop.pontuacao[self._i])
+
+
+    @pontuacao.setter
+    def pontuacao(self, pontuacao: int) -> None:
+        if self._pop is None:
+            self._pontuacao = pontuacao
+        else:
+            self._pop.pontuacao[self._i] = pontuacao
+            self._pop.alteracoes += 1
+
+
+    @property
+    def comidas(self) -> int:
+        """Quantidade de comidas obtidas pelo individuo."""
+        if self._pop is None:
+            return self._comidas
+        return int(self._pop.comidas[self._i])
+
+
+    @comidas.setter
+    def comidas(self, comidas: int) -> None:
+        if self._pop is None:
+            self._comidas = comidas
+        else:
+            self._pop.comidas[self._i] = comidas
+
+
+    @property
+    def checkpoint(self) -> Checkpoint:
+        """Estado da exploracao no fim dos movimentos corretos (posicao, casas visitadas, pontuacao e comidas),
+           de onde um filho que herda esses movimentos continua a exploracao. None se ainda nao explorou."""
+        if self._pop is None:
+            return self._checkpoint
+        return self._pop.checkpoint(np.array([self._i]))
+
+
+    @checkpoint.setter
+    def checkpoint(self, checkpoint: Checkpoint) -> None:
+        if self._pop is None:
+            self._checkpoint = checkpoint
+        else:
+            self._pop.guarda_checkpoint(self._i, checkpoint)
+
+
+    def atribui(self, outro: 'Individuo') -> None:
+        """Copia os movimentos e o resultado da exploracao de outro individuo para este. Cada individuo fica
+           dono das proprias listas, entao alterar um nao altera o outro."""
+        self.movimentos = _lista(outro.movimentos)
+        self.movimentos_corretos = list(outro.movimentos_corretos)
+        self.pontuacao = outro.pontuacao
+        self.comidas = outro.comidas
+        if outro.checkpoint is not None:
+            self.checkpoint = outro.checkpoint
+
+
+    def gera_movimentos(self, x: int = 10, rng: np.random.Generator = None) -> None:
+        """Gera uma sequencia de x movimentos aleatorios para um individuo, sorteados de uma vez.
 
         Args:
             x (int, optional): Quantidade de movimentos. Defaults to 10.
+            rng (np.random.Generator, optional): Gerador aleatorio. Defaults to um gerador novo.
         """        
-        self.movimentos = [random.randint(0, 7) for _ in range(x)]
+        if rng is None:
+            rng = np.random.default_rng()
+        self.movimentos = rng.integers(0, 8, x).tolist()
 
 
     def _movimenta(self, movimento: int, pos_inicial: tuple) -> tuple:
@@ -64,89 +182,114 @@ class Individuo:
         Returns:
             tuple: Coordenadas da posicao final.
         """        
-        nova_pos = self._movimenta(movimento, pos_inicial)
+        destino = lab.transicoes_lista()[lab.indice(pos_inicial)*8 + movimento]
 
-        if (nova_pos[0] >= 0 and nova_pos[0] < lab.caminho.shape[0]) and (nova_pos[1] >= 0 and nova_pos[1] < lab.caminho.shape[0]): 
-            
-            if lab.caminho[nova_pos[0]][nova_pos[1]] == 1:
-                return pos_inicial 
-            else:
-                return nova_pos 
-        else:
+        if destino == FORA:
             return (np.nan, np.nan)
+        else:
+            return lab.posicao(destino)
 
 
-    def _pontua(self, lab: Labirinto, pos_inicial: tuple, pos_final: tuple, posicoes: list) -> int:
+    def _pontua(self, lab: Labirinto, casa_inicial: int, casa_final: int, visitados: bytearray) -> int:
         """Gera uma pontuacao para um movimento especifico. Verifica se a posicao final eh valida e caso 
            for, se o indiviuo ja passou por a aquela posicao.
 
         Args:
             lab (Labirinto): Labirinto onde o movimento eh executado. 
-            pos_inicial (tuple): Coordenadas iniciais do movimento. 
-            pos_final (tuple): Coordenadas finais do movimento.
-            posicoes (list): Posicoes percorridas pelo individuo.
+            casa_inicial (int): Indice (Labirinto.indice) da casa inicial do movimento. 
+            casa_final (int): Indice da casa final do movimento.
+            visitados (bytearray): Casas visitadas pelo individuo, indexadas por Labirinto.indice.
 
         Returns:
             int: Pontos gerado pelo movimento. 
         """        
-        if pos_final == pos_inicial:
+        if casa_final == casa_inicial:
             return -1 # bateu em uma parede
         else:
-            if pos_final in posicoes:
+            casa = casa_final
+            if visitados[casa]:
                 return 0 # foi para um lugar que ja havia visitado
             else:
-                if pos_final in lab.pos_comidas:
+                if lab.mascara_comidas[casa]:
                     return 10 # comeu uma comida em um lugar novo
                 else:
                     return 3 # foi para um lugar novo
 
 
-    def explora(self, lab: Labirinto) -> None:
+    def explora(self, lab: Labirinto, guarda_caminho: bool = False) -> None:
         """Executa todos os movimentos de um individuo e soma em sua pontuacao total, 
-           os pontos gerados por cada um, atualizando a lista de posicoes percorridas 
-           e de movimentos corretos. 
+           os pontos gerados por cada um, atualizando os movimentos corretos e, se pedido,
+           a lista de posicoes percorridas. 
 
         Args:
             lab (Labirinto): Labirinto onde os movimentos sao executados. 
+            guarda_caminho (bool, optional): Guarda as posicoes percorridas em ordem (usado para escrever
+                a solucao). Defaults to False.
         """        
+        # comeca a exploracao do zero, em variaveis locais
+        movimentos = _lista(self.movimentos)
+        movimentos_corretos = []
+        posicoes_percorridas = [lab.pos_inicial] if guarda_caminho else []
+        visitados = bytearray(lab.caminho.size)
+        visitados[lab.indice(lab.pos_inicial)] = 1
+        pontuacao = 0
+        paredes = 0
+        comidas = 0
+
         i = 0
-        pos_anterior = lab.pos_inicial
-        self.posicoes_percorridas.append(lab.pos_inicial)
+        transicoes = lab.transicoes_lista()
+        casa_anterior = lab.indice(lab.pos_inicial)
+        limite_comidas = lab.limite_comidas
 
-        while i < len(self.movimentos) and self.comidas < lab.caminho.shape[0]/2:
+        while i < len(movimentos) and comidas < limite_comidas:
 
-            # gera nova posicao 
-            nova_pos = self.anda(lab, self.movimentos[i], pos_anterior)
+            # gera nova posicao com uma consulta na tabela de transicoes
+            nova_casa = transicoes[casa_anterior*8 + movimentos[i]]
 
             # verificia se saiu do labirinto
-            if nova_pos == (np.nan, np.nan):
+            if nova_casa == FORA:
                 break
 
             # pontua o movimento
-            pontos = self._pontua(lab, pos_anterior, nova_pos, self.posicoes_percorridas)
+            pontos = self._pontua(lab, casa_anterior, nova_casa, visitados)
 
             # verifica o movimento 
             if pontos >= 0:
-                self.movimentos_corretos.append(self.movimentos[i])
+                movimentos_corretos.append(movimentos[i])
                 if pontos > 0:
-                    self.posicoes_percorridas.append(nova_pos)
+                    visitados[nova_casa] = 1
+                    if guarda_caminho:
+                        posicoes_percorridas.append(lab.posicao(nova_casa))
                     if pontos == 10:
-                        self.comidas += 1
+                        comidas += 1
             
             # pontua 
-            self.pontuacao += pontos
+            pontuacao += pontos
+            if pontos < 0:
+                paredes += 1
 
             # atualiza a posicao de partida
-            pos_anterior = (nova_pos[0], nova_pos[1])
+            casa_anterior = nova_casa
 
             # aumenta o index
             i += 1
 
+        # guarda o resultado no individuo
+        self.movimentos_corretos = movimentos_corretos
+        self.posicoes_percorridas = posicoes_percorridas
+        self.pontuacao = pontuacao
+        self.comidas = comidas
+
+        # guarda o estado no fim dos movimentos corretos
+        visitados = np.packbits(np.frombuffer(visitados, dtype=bool))[None]
+        self.checkpoint = Checkpoint(np.array([len(movimentos_corretos)]), np.array([casa_anterior]),
+                                     visitados, np.array([pontuacao + paredes]), np.array([comidas]))
+
 
     def copy(self):
         """Copia um indivio para outro objeto."""     
         i = Individuo()
-        i.movimentos = self.movimentos_corretos
+        i.movimentos = list(self.movimentos_corretos)
 
         return i
 
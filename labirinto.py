@@ -1,5 +1,28 @@
+import os
+import hashlib
 import numpy as np
 
+# deslocamento (linha, coluna) de cada um dos 8 movimentos, na mesma ordem de Individuo._movimenta
+DELTAS = np.array([(-1, -1), (-1, 0), (-1, 1),
+                   (0, -1),           (0, 1),
+                   (1, -1),  (1, 0),  (1, 1)], dtype=np.int64)
+
+# valor da tabela de transicoes para um movimento que sai do labirinto
+FORA = -1
+
+# formato binario: assinatura e (linhas, colunas), completados ate CABECALHO bytes, seguidos de um byte por casa
+ASSINATURA = b'LABBIN1\n'
+CABECALHO = 16
+
+# quantidade de caracteres do hash do conteudo do labirinto no inicio do cache de transicoes
+TAMANHO_CHAVE = 16
+
+# valor de cada simbolo do formato texto ('-' marca um numero negativo, como -1)
+_VALORES = np.full(256, 127, dtype=np.int8)
+_VALORES[[ord('0'), ord('1'), ord('2'), ord('E'), ord('C')]] = [0, 1, 2, -1, 2]
+_ESPACOS = np.zeros(256, dtype=bool)
+_ESPACOS[[ord(' '), ord('\t'), ord('\r'), ord('\n')]] = True
+
 class Labirinto:
 
     def __init__(self, arquivo: str) -> None:
@@ -9,9 +32,161 @@ class Labirinto:
         Args:
             arquivo (str): Nome do arquivo. 
         """        
-        self.caminho = self._cria_lab_de_arquivo(arquivo)
+        if eh_binario(arquivo):
+            self.caminho = le_labirinto_binario(arquivo)
+        else:
+            self.caminho = self._cria_lab_de_arquivo(arquivo)
+        self._prepara()
+        self.transicoes = self._carrega_transicoes(arquivo)
+
+
+    @classmethod
+    def de_matriz(cls, caminho: np.ndarray) -> 'Labirinto':
+        """Cria um labirinto diretamente de uma matriz do numpy, sem ler arquivo.
+
+        Args:
+            caminho (np.ndarray): Matriz do labirinto (-1 = entrada, 0 = livre, 1 = parede, 2 = comida).
+
+        Returns:
+            Labirinto: Labirinto que usa a matriz recebida como caminho.
+        """
+        lab = cls.__new__(cls)
+        lab.caminho = caminho
+        lab._prepara()
+        lab.transicoes = lab._cria_transicoes()
+
+        return lab
+
+
+    def _prepara(self) -> None:
+        """Calcula as informacoes do labirinto usadas a cada movimento: posicao inicial, comidas e a 
+           mascara plana das comidas, indexada por Labirinto.indice."""
+        self.n_linhas, self.n_colunas = self.caminho.shape
         self.pos_inicial = self._retorna_pos_inicial()
         self.pos_comidas = self._retorna_pos_comidas()
+        self.mascara_comidas = (self.caminho == 2).ravel().astype(np.uint8).tobytes()
+        self.casas_comidas = np.flatnonzero(self.caminho.ravel() == 2)
+        self._transicoes_lista = None
+        self._transicoes_passos = {}
+        self._distancias_comidas = None
+        self._alcance_comidas = None
+
+
+    def assinatura(self) -> str:
+        """Retorna um hash do conteudo do labirinto, que identifica o labirinto em caches e checkpoints."""
+        caminho = np.ascontiguousarray(self.caminho, dtype=np.int8)
+        return hashlib.sha1(str(caminho.shape).encode() + caminho.tobytes()).hexdigest()
+
+
+    @property
+    def tamanho_genoma(self) -> int:
+        """Quantidade de movimentos de cada individuo que explora o labirinto (3 por casa, 3*dim^2 no quadrado)."""
+        return 3*self.n_linhas*self.n_colunas
+
+
+    @property
+    def limite_comidas(self) -> float:
+        """Quantidade de comidas que resolve o labirinto (metade da maior dimensao, dim/2 no quadrado)."""
+        return max(self.n_linhas, self.n_colunas)/2
+
+
+    def indice(self, posicao: tuple) -> int:
+        """Codifica uma coordenada (linha, coluna) no indice da casa na matriz achatada."""
+        return posicao[0]*self.n_colunas + posicao[1]
+
+
+    def posicao(self, indice: int) -> tuple:
+        """Decodifica o indice de uma casa na coordenada (linha, coluna)."""
+        return divmod(indice, self.n_colunas)
+
+
+    def _cria_transicoes(self) -> np.ndarray:
+        """Monta a tabela (casas, 8) com a casa de destino de cada movimento feito de cada casa. Se o 
+           movimento bate em uma parede, o destino eh a propria casa; se sai do labirinto, eh FORA.
+
+        Returns:
+            np.ndarray: Tabela de transicoes int32, indexada por [Labirinto.indice(posicao), movimento].
+        """
+        linhas, colunas = np.divmod(np.arange(self.caminho.size), self.n_colunas)
+        novas_linhas = linhas[:, None] + DELTAS[:, 0]
+        novas_colunas = colunas[:, None] + DELTAS[:, 1]
+
+        dentro = (novas_linhas >= 0) & (novas_linhas < self.n_linhas) & (novas_colunas >= 0) & (novas_colunas < self.n_colunas)
+        destino = np.where(dentro, novas_linhas*self.n_colunas + novas_colunas, 0)
+        parede = (self.caminho == 1).ravel()[destino]
+        origem = np.arange(self.caminho.size)[:, None]
+
+        return np.where(dentro, np.where(parede, origem, destino), FORA).astype(np.int32)
+
+
+    def _carrega_transicoes(self, arquivo: str) -> np.ndarray:
+        """Le a tabela de transicoes do cache ao lado do arquivo do labirinto. O cache eh um arquivo so por
+           labirinto, que comeca com o hash do conteudo do arquivo, seguido da tabela no formato .npy (lida com
+           memmap). Se o hash nao confere (o labirinto mudou) ou o cache nao existe, monta a tabela e tenta
+           sobrescrever o cache."""
+        with open(arquivo, 'rb') as f:
+            chave = hashlib.sha1(f.read()).hexdigest()[:TAMANHO_CHAVE].encode()
+        cache = f'{arquivo}.transicoes.npy'
+
+        if os.path.exists(cache):
+            try:
+                transicoes = _le_cache_transicoes(cache, chave)
+                if transicoes is not None and transicoes.shape == (self.caminho.size, 8):
+                    return transicoes
+            except (OSError, ValueError):
+                pass
+
+        # escreve em um arquivo temporario e renomeia, para outro processo nunca ler o cache pela metade
+        transicoes = self._cria_transicoes()
+        temporario = f'{cache}.{os.getpid()}.tmp'
+        try:
+            with open(temporario, 'wb') as f:
+                f.write(chave)
+                np.save(f, transicoes)
+            os.replace(temporario, cache)
+        except OSError:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+        return transicoes
+
+
+    def transicoes_lista(self) -> list:
+        """Retorna a tabela de transicoes achatada em uma lista do python (destino = lista[casa*8 + movimento]),
+           mais rapida para acessar um elemento por vez."""
+        if self._transicoes_lista is None:
+            self._transicoes_lista = self.transicoes.ravel().tolist()
+
+        return self._transicoes_lista
+
+
+    def transicoes_passos(self, k: int) -> np.ndarray:
+        """Retorna (e guarda) a tabela de k passos: para cada casa e cada sequencia de k movimentos, as casas
+           depois de cada um deles (ver transicoes_multiplas)."""
+        if k not in self._transicoes_passos:
+            self._transicoes_passos[k] = transicoes_multiplas(self.transicoes, k)
+
+        return self._transicoes_passos[k]
+
+
+    def distancias_comidas(self) -> np.ndarray:
+        """Retorna (e guarda) o campo de distancias de cada comida: em [j, casa], a quantidade minima de
+           movimentos de casa ate a comida casas_comidas[j], andando so por casas livres
+           nas 8 direcoes. Casas sem caminho ate a comida (e paredes) ficam com caminho.size (ver distancias_bfs)."""
+        if self._distancias_comidas is None:
+            self._distancias_comidas = distancias_bfs(self.transicoes, self.casas_comidas[:, None])
+
+        return self._distancias_comidas
+
+
+    def alcance_comidas(self) -> int:
+        """Retorna (e guarda) a maior distancia alcancavel dos campos de distancias_comidas mais 1, de onde a
+           aptidao moldada conta os passos a menos ate a comida mais proxima."""
+        if self._alcance_comidas is None:
+            distancias = self.distancias_comidas()
+            self._alcance_comidas = int(distancias[distancias < self.caminho.size].max(initial=0)) + 1
+
+        return self._alcance_comidas
 
 
     def _cria_lab_de_arquivo(self, arquivo: str) -> np.ndarray:
@@ -23,25 +198,13 @@ class Labirinto:
         Returns:
             np.ndarray: Matriz do numpy representando o labirinto. 
         """        
-        with open(arquivo, 'r') as f:
-            linhas = f.readlines()
-            dim = int(linhas[0])
-            lab = []
-
-            for linha in linhas[1:]:
-                linha = linha.split('\n')[0].split(' ')
-                linha = [int(i) if i not in ['E', 'C'] else (-1 if i == 'E' else 2) for i in linha]
-                lab.append(linha)
-
-            lab = np.array(lab).reshape(dim, dim)
-        
-        return lab
+        return le_labirinto_texto(arquivo)
 
 
     def _retorna_pos_inicial(self) -> tuple:
         """Retorna a posicao inicial de onde o indivio comeca a exploracao."""
         posicao = np.where(self.caminho == -1)
-        pos_inicial = (posicao[0][0], posicao[1][0])
+        pos_inicial = (int(posicao[0][0]), int(posicao[1][0]))
 
         return pos_inicial
 
@@ -96,3 +259,244 @@ class Labirinto:
         frases.append('\n'+'-'*34)
 
         return frases
+
+
+def transicoes_multiplas(transicoes: np.ndarray, k: int) -> np.ndarray:
+    """Monta a tabela de k passos a partir da tabela de transicoes de um passo.
+
+    Args:
+        transicoes (np.ndarray): Tabela (casas, 8) de transicoes de um passo.
+        k (int): Quantidade de passos.
+
+    Returns:
+        np.ndarray: Tabela int32 (casas, 8**k, k): em [casa, codigo, j], a casa depois do movimento j da sequencia
+            codigo = m0*8**(k-1) + ... + m(k-1), partindo de casa. Depois de sair do labirinto, todas sao FORA.
+    """
+    codigos = np.arange(8**k)
+    tabela = np.empty((transicoes.shape[0], 8**k, k), dtype=np.int32)
+    casa = np.broadcast_to(np.arange(transicoes.shape[0])[:, None], (transicoes.shape[0], 8**k))
+    for j in range(k):
+        movimento = (codigos // 8**(k-1-j)) % 8
+        casa = np.where(casa == FORA, FORA, transicoes[np.maximum(casa, 0), movimento])
+        tabela[:, :, j] = casa
+
+    return tabela
+
+
+def distancias_bfs(transicoes: np.ndarray, origens: np.ndarray) -> np.ndarray:
+    """Busca em largura com varias origens sobre a tabela de transicoes (so os movimentos que mudam de casa sem
+       sair do labirinto). Os movimentos sao simetricos, entao a distancia de uma origem ate a casa eh a mesma
+       da casa ate a origem. Cada linha de origens eh uma busca independente, e todas andam juntas, uma camada
+       por iteracao.
+
+    Args:
+        transicoes (np.ndarray): Tabela (casas, 8) de transicoes de um passo.
+        origens (np.ndarray): Matriz (campos, k) com as k casas de origem de cada campo.
+
+    Returns:
+        np.ndarray: Matriz int32 (campos, casas) com a distancia de cada casa ate a origem mais proxima do campo;
+            casas que nao alcancam nenhuma origem ficam com a quantidade de casas.
+    """
+    transicoes = np.asarray(transicoes)
+    n_casas = transicoes.shape[0]
+    distancias = np.full((len(origens), n_casas), n_casas, dtype=np.int32)
+    campos = np.repeat(np.arange(len(origens)), np.shape(origens)[1])
+    casas = np.asarray(origens, dtype=np.intp).ravel()
+    distancias[campos, casas] = 0
+
+    d = 0
+    while len(casas) > 0:
+        d += 1
+        vizinhas = transicoes[casas]
+        campos = np.repeat(campos, 8)
+        vizinhas = vizinhas.ravel()
+        # paredes devolvem a propria casa, que ja tem distancia; FORA eh descartado antes de indexar
+        dentro = vizinhas != FORA
+        campos, vizinhas = campos[dentro], vizinhas[dentro]
+        novas = distancias[campos, vizinhas] == n_casas
+        campos, casas = campos[novas], vizinhas[novas]
+        distancias[campos, casas] = d
+        # a mesma casa pode ter sido alcancada por duas vizinhas da camada
+        unicas = np.unique(campos.astype(np.int64)*n_casas + casas)
+        campos, casas = np.divmod(unicas, n_casas)
+
+    return distancias
+
+
+# formas de juntar as pontuacoes de um genoma nos labirintos de um LabirintoSet
+AGREGACOES = ('media', 'min', 'soma')
+
+class LabirintoSet:
+
+    def __init__(self, labirintos: list, agregacao: str = 'media') -> None:
+        """Inicializa um conjunto de labirintos de mesma forma, onde cada genoma eh avaliado em todos os
+           labirintos de uma vez (ver avaliacao.avalia_conjunto). Os labirintos ficam empilhados em um tensor
+           (labirintos, linhas, colunas) e as tabelas de transicoes em uma so tabela, com as casas do labirinto
+           k deslocadas de k*linhas*colunas.
+
+        Args:
+            labirintos (list): Labirintos do conjunto, todos com a mesma forma.
+            agregacao (str, optional): Como as pontuacoes de um genoma sao juntadas: 'media', 'min' ou 'soma'. Defaults to 'media'.
+        """
+        if agregacao not in AGREGACOES:
+            raise ValueError(f'Agregacao desconhecida: {agregacao}')
+        if len(labirintos) == 0 or len({lab.caminho.shape for lab in labirintos}) != 1:
+            raise ValueError('O conjunto precisa de pelo menos um labirinto e todos precisam ter a mesma forma')
+
+        self.labirintos = list(labirintos)
+        self.agregacao = agregacao
+        self.caminho = np.stack([lab.caminho for lab in labirintos])
+        self.n_linhas, self.n_colunas = self.caminho.shape[1:]
+        n_casas = self.n_linhas*self.n_colunas
+
+        # informacoes de cada labirinto, com as casas numeradas no conjunto todo
+        self.bases = n_casas*np.arange(len(labirintos), dtype=np.int64)
+        self.casas_iniciais = np.array([lab.indice(lab.pos_inicial) for lab in labirintos], dtype=np.int64) + self.bases
+        self.mascara_comidas = b''.join(lab.mascara_comidas for lab in labirintos)
+        transicoes = np.stack([lab.transicoes for lab in labirintos])
+        deslocadas = transicoes + self.bases[:, None, None].astype(np.int32)
+        self.transicoes = np.where(transicoes == FORA, FORA, deslocadas).astype(np.int32).reshape(-1, 8)
+
+
+    @classmethod
+    def de_matriz(cls, caminho: np.ndarray, agregacao: str = 'media') -> 'LabirintoSet':
+        """Cria um conjunto a partir de um tensor (labirintos, linhas, colunas)."""
+        return cls([Labirinto.de_matriz(matriz) for matriz in caminho], agregacao)
+
+
+    def __len__(self) -> int:
+        return len(self.labirintos)
+
+
+    @property
+    def tamanho_genoma(self) -> int:
+        """Quantidade de movimentos de cada individuo, a mesma de cada labirinto."""
+        return self.labirintos[0].tamanho_genoma
+
+
+    @property
+    def limite_comidas(self) -> float:
+        """Quantidade de comidas que resolve cada labirinto."""
+        return self.labirintos[0].limite_comidas
+
+
+    def assinatura(self) -> str:
+        """Retorna um hash dos labirintos e da agregacao, que identifica o conjunto em caches e checkpoints."""
+        partes = [lab.assinatura() for lab in self.labirintos] + [self.agregacao]
+        return hashlib.sha1(' '.join(partes).encode()).hexdigest()
+
+
+def le_labirinto_texto(arquivo: str) -> np.ndarray:
+    """Le um labirinto no formato texto com operacoes vetorizadas sobre os bytes do arquivo. A primeira linha
+       tem a dimensao (labirinto quadrado) ou a quantidade de linhas e de colunas; cada linha seguinte tem as
+       casas separadas por espacos (0 = livre, 1 = parede, E = entrada, C = comida).
+
+    Args:
+        arquivo (str): Nome do arquivo.
+
+    Returns:
+        np.ndarray: Matriz int8 do labirinto (-1 = entrada, 0 = livre, 1 = parede, 2 = comida).
+    """
+    with open(arquivo, 'rb') as f:
+        cabecalho = f.readline().split()
+        dados = np.frombuffer(f.read(), dtype=np.uint8)
+
+    # cada casa eh um simbolo (ou '-' e um simbolo) entre espacos
+    simbolo = ~_ESPACOS[dados]
+    inicio = np.flatnonzero(simbolo & ~np.concatenate(([False], simbolo[:-1])))
+    fim = np.flatnonzero(simbolo & ~np.concatenate((simbolo[1:], [False]))) + 1
+    negativo = dados[inicio] == ord('-')
+    valores = _VALORES[dados[inicio + negativo]]
+    valores[negativo] *= -1
+    if np.any(fim - inicio != 1 + negativo) or np.any(valores == 127) or np.any(valores == -127):
+        raise ValueError(f'{arquivo} tem casas invalidas')
+
+    # quantidade de casas de cada linha nao vazia do arquivo
+    linha = np.cumsum(dados == ord('\n'))[inicio]
+    por_linha = np.unique(linha, return_counts=True)[1]
+    n_linhas = len(por_linha)
+    n_colunas = int(por_linha[0]) if n_linhas else 0
+    esperado = (int(cabecalho[0]), int(cabecalho[-1]))
+    if np.any(por_linha != n_colunas) or (n_linhas, n_colunas) != esperado:
+        raise ValueError(f'{arquivo} deveria ter {esperado[0]} linhas de {esperado[1]} casas')
+
+    return valores.reshape(n_linhas, n_colunas)
+
+
+def eh_binario(arquivo: str) -> bool:
+    """Verifica se o arquivo esta no formato binario de labirinto."""
+    with open(arquivo, 'rb') as f:
+        return f.read(len(ASSINATURA)) == ASSINATURA
+
+
+def _le_cache_transicoes(cache: str, chave: bytes) -> np.ndarray:
+    """Abre com memmap a tabela de um cache de transicoes (ver Labirinto._carrega_transicoes), ou retorna None
+       se o cache foi gerado para outro conteudo do labirinto."""
+    with open(cache, 'rb') as f:
+        if f.read(TAMANHO_CHAVE) != chave:
+            return None
+        versao = np.lib.format.read_magic(f)
+        if versao == (1, 0):
+            forma, fortran, tipo = np.lib.format.read_array_header_1_0(f)
+        else:
+            forma, fortran, tipo = np.lib.format.read_array_header_2_0(f)
+        inicio = f.tell()
+
+    return np.memmap(cache, dtype=tipo, mode='r', offset=inicio, shape=forma, order='F' if fortran else 'C')
+
+
+def le_labirinto_binario(arquivo: str) -> np.ndarray:
+    """Abre um labirinto no formato binario com np.memmap, sem ler o arquivo: as paginas so sao lidas quando
+       usadas e sao compartilhadas entre os processos que abrem o mesmo arquivo. O mapa eh copy-on-write, entao
+       alteracoes no caminho ficam so na memoria do processo.
+
+    Args:
+        arquivo (str): Nome do arquivo.
+
+    Returns:
+        np.ndarray: Matriz int8 (memmap) do labirinto.
+    """
+    with open(arquivo, 'rb') as f:
+        cabecalho = f.read(CABECALHO)
+    if cabecalho[:len(ASSINATURA)] != ASSINATURA:
+        raise ValueError(f'{arquivo} nao eh um labirinto binario')
+    forma = tuple(int(n) for n in np.frombuffer(cabecalho, dtype='<u4', count=2, offset=len(ASSINATURA)))
+
+    return np.memmap(arquivo, dtype=np.int8, mode='c', offset=CABECALHO, shape=forma)
+
+
+def salva_labirinto_binario(caminho: np.ndarray, arquivo: str) -> None:
+    """Escreve um labirinto no formato binario: cabecalho com a forma e um byte (int8) por casa."""
+    cabecalho = ASSINATURA + np.array(caminho.shape, dtype='<u4').tobytes()
+    with open(arquivo, 'wb') as f:
+        f.write(cabecalho.ljust(CABECALHO, b'\0'))
+        f.write(np.ascontiguousarray(caminho, dtype=np.int8).tobytes())
+
+
+def salva_labirinto_texto(caminho: np.ndarray, arquivo: str) -> None:
+    """Escreve um labirinto no formato texto, montando todos os bytes de uma vez. A primeira linha tem so a
+       dimensao se o labirinto for quadrado, como labirinto1.txt, ou a quantidade de linhas e de colunas."""
+    simbolos = np.frombuffer(b'E01C', dtype=np.uint8)
+    n_linhas, n_colunas = caminho.shape
+    texto = np.full((n_linhas, 2*n_colunas), ord(' '), dtype=np.uint8)
+    texto[:, 0::2] = simbolos[np.asarray(caminho) + 1]
+    texto[:, -1] = ord('\n')
+
+    with open(arquivo, 'wb') as f:
+        f.write((f'{n_linhas}\n' if n_linhas == n_colunas else f'{n_linhas} {n_colunas}\n').encode())
+        f.write(texto.tobytes()[:-1])
+
+
+def converte_labirinto(entrada: str, saida: str) -> None:
+    """Converte um labirinto do formato texto para o binario, ou do binario para o texto."""
+    if eh_binario(entrada):
+        salva_labirinto_texto(le_labirinto_binario(entrada), saida)
+    else:
+        salva_labirinto_binario(le_labirinto_texto(entrada), saida)
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        sys.exit('Uso: python labirinto.py entrada saida  (converte entre os formatos texto e binario)')
+    converte_labirinto(sys.argv[1], sys.argv[2])
@@ -0,0 +1,181 @@
+from populacao import Populacao
+import numpy as np
+import tracemalloc
+import cProfile
+import pstats
+import json
+
+
+class Metricas:
+
+    def __init__(self, geracao: int, tempos: dict, duracao: float, pop: Populacao, cache: dict = None) -> None:
+        """Metricas de uma geracao entregues aos observadores. As estatisticas da populacao so sao calculadas
+           quando lidas, entao um observador que so usa os tempos nao paga por elas.
+
+        Args:
+            geracao (int): Numero da geracao.
+            tempos (dict): Tempo (s) gasto em cada fase (ver ag.FASES) desde a geracao anterior.
+            duracao (float): Tempo (s) total desde a geracao anterior.
+            pop (Populacao): Populacao da geracao. Nao deve ser alterada pelo observador.
+            cache (dict, optional): Acertos e falhas do cache de avaliacao desde a geracao anterior. Defaults to None.
+        """
+        self.geracao = geracao
+        self.tempos = tempos
+        self.duracao = duracao
+        self.pop = pop
+        self.cache = cache if cache is not None else {'acertos': 0, 'falhas': 0}
+
+
+    @property
+    def minimo(self) -> int:
+        """Menor pontuacao da populacao."""
+        return int(self.pop.pontuacao.min())
+
+
+    @property
+    def media(self) -> float:
+        """Pontuacao media da populacao."""
+        return float(self.pop.pontuacao.mean())
+
+
+    @property
+    def maximo(self) -> int:
+        """Maior pontuacao da populacao."""
+        return int(self.pop.pontuacao.max())
+
+
+    @property
+    def desvio(self) -> float:
+        """Desvio padrao das pontuacoes da populacao."""
+        return float(self.pop.pontuacao.std())
+
+
+    @property
+    def melhor_comidas(self) -> int:
+        """Maior quantidade de comidas de um individuo da populacao."""
+        return int(self.pop.comidas.max())
+
+
+    @property
+    def distintos(self) -> int:
+        """Quantidade de pontuacoes distintas na populacao."""
+        return len(np.unique(self.pop.pontuacao))
+
+
+    def como_dict(self) -> dict:
+        """Retorna todas as metricas em um dicionario serializavel em json."""
+        return {'geracao': self.geracao, 'duracao': self.duracao, 'tempos': dict(self.tempos), 'cache': dict(self.cache),
+                'minimo': self.minimo, 'media': self.media, 'maximo': self.maximo, 'desvio': self.desvio,
+                'melhor_comidas': self.melhor_comidas, 'distintos': self.distintos}
+
+
+class Observador:
+    """Recebe as metricas de cada geracao de AlgoritmoGenetico.fit. As subclasses sobrescrevem so os metodos
+       que precisam."""
+
+    def inicia(self, ag) -> None:
+        """Chamado no inicio de fit, antes da primeira geracao."""
+        pass
+
+
+    def geracao(self, metricas: Metricas) -> None:
+        """Chamado depois de cada geracao ser gerada, registrada e verificada."""
+        pass
+
+
+    def fim(self, ag) -> None:
+        """Chamado no fim de fit, mesmo se a execucao for interrompida por um erro."""
+        pass
+
+
+class ObservadorFuncao(Observador):
+    """Chama uma funcao com as metricas de cada geracao."""
+
+    def __init__(self, funcao) -> None:
+        self.funcao = funcao
+
+
+    def geracao(self, metricas: Metricas) -> None:
+        self.funcao(metricas)
+
+
+class ObservadorJson(Observador):
+    """Escreve as metricas de cada geracao em um arquivo com um objeto json por linha, que pode ser lido
+       enquanto a execucao continua (por exemplo, para alimentar um painel)."""
+
+    def __init__(self, arquivo: str) -> None:
+        self.arquivo = arquivo
+        self._f = None
+
+
+    def inicia(self, ag) -> None:
+        self._f = open(self.arquivo, 'w', buffering=1)
+
+
+    def geracao(self, metricas: Metricas) -> None:
+        self._f.write(json.dumps(metricas.como_dict()) + '\n')
+
+
+    def fim(self, ag) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class PerfilCProfile(Observador):
+    """Mede toda a execucao de fit com o cProfile. O resultado fica em estatisticas (pstats.Stats) e, se um
+       arquivo for informado, eh salvo nele (lido por pstats ou snakeviz)."""
+
+    def __init__(self, arquivo: str = None) -> None:
+        self.arquivo = arquivo
+        self.estatisticas = None
+        self._perfil = None
+
+
+    def inicia(self, ag) -> None:
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+
+    def fim(self, ag) -> None:
+        if self._perfil is None:
+            return
+        self._perfil.disable()
+        self.estatisticas = pstats.Stats(self._perfil)
+        self._perfil = None
+        if self.arquivo is not None:
+            self.estatisticas.dump_stats(self.arquivo)
+
+
+class PerfilMemoria(Observador):
+    """Mede a memoria alocada com o tracemalloc: guarda o uso atual e o pico de cada geracao em memoria, uma
+       lista de (geracao, atual, pico) em bytes, e as linhas que mais alocaram ate o fim em maiores."""
+
+    def __init__(self, n_maiores: int = 10) -> None:
+        self.n_maiores = n_maiores
+        self.memoria = []
+        self.maiores = []
+        self._iniciou = False
+
+
+    def inicia(self, ag) -> None:
+        self.memoria = []
+        self._iniciou = not tracemalloc.is_tracing()
+        if self._iniciou:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+
+    def geracao(self, metricas: Metricas) -> None:
+        atual, pico = tracemalloc.get_traced_memory()
+        self.memoria.append((metricas.geracao, atual, pico))
+        tracemalloc.reset_peak()
+
+
+    def fim(self, ag) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        self.maiores = tracemalloc.take_snapshot().statistics('lineno')[:self.n_maiores]
+        if self._iniciou:
+            tracemalloc.stop()
+            self._iniciou = False
@@ -0,0 +1,121 @@
+from populacao import Populacao
+import numpy as np
+
+# acoes possiveis quando a populacao estagna
+ACOES = ('para', 'reinicia')
+
+# pesos (impares, fixos) do hash de cada gene; a multiplicacao de uint64 da a volta, como um hash polinomial
+_PESOS = np.random.default_rng(0x5EED).integers(0, 2**63, 1 << 16, dtype=np.uint64) | np.uint64(1)
+
+
+def hash_genomas(genomas: np.ndarray) -> np.ndarray:
+    """Retorna um hash de 64 bits de cada genoma, calculado de uma vez para a populacao toda."""
+    n_genes = genomas.shape[1]
+    pesos = _PESOS[:n_genes] if n_genes <= len(_PESOS) else np.resize(_PESOS, n_genes)
+
+    return (genomas.astype(np.uint64) + np.uint64(1)) @ pesos
+
+
+def diversidade(genomas: np.ndarray) -> float:
+    """Fracao de genomas distintos na populacao (1 = todos diferentes)."""
+    return len(np.unique(hash_genomas(genomas))) / len(genomas)
+
+
+class CriterioParada:
+
+    def __init__(self, janela: int = 50, tolerancia: float = 0.0, min_diversidade: float = 0.0, acao: str = 'para', fracao_reinicio: float = 0.5, max_reinicios: int = 3) -> None:
+        """Inicializa o criterio de parada por estagnacao usado por AlgoritmoGenetico.fit alem da convergencia.
+           A cada geracao, so o melhor valor ja visto da maior pontuacao e da pontuacao media e a geracao em
+           que cada um melhorou sao atualizados (nenhum historico eh guardado). A populacao estagna quando
+           nenhum dos dois melhora por janela geracoes ou quando a fracao de genomas distintos fica abaixo de
+           min_diversidade. Entao a execucao para ou reinicia, trocando os piores individuos por novos.
+
+        Args:
+            janela (int, optional): Geracoes sem melhora da maior pontuacao nem da media ate estagnar. 0 desliga. Defaults to 50.
+            tolerancia (float, optional): Quanto a pontuacao media precisa subir para contar como melhora. Defaults to 0.0.
+            min_diversidade (float, optional): Fracao minima de genomas distintos (pelo hash). 0 desliga. Defaults to 0.0.
+            acao (str, optional): 'para' encerra a execucao; 'reinicia' reinjeta individuos novos. Defaults to 'para'.
+            fracao_reinicio (float, optional): Fracao da populacao (os piores) trocada em cada reinicio. Defaults to 0.5.
+            max_reinicios (int, optional): Quantidade de reinicios antes de parar de vez. Defaults to 3.
+        """
+        if acao not in ACOES:
+            raise ValueError(f'Acao de parada desconhecida: {acao}')
+        self.janela = janela
+        self.tolerancia = tolerancia
+        self.min_diversidade = min_diversidade
+        self.acao = acao
+        self.fracao_reinicio = fracao_reinicio
+        self.max_reinicios = max_reinicios
+        self.reinicia_estado()
+
+
+    def configuracao(self) -> dict:
+        """Retorna os parametros do criterio, serializaveis em json (identificam o criterio no cache da busca
+           e precisam ser iguais para retomar uma execucao salva)."""
+        return {'janela': self.janela, 'tolerancia': self.tolerancia, 'min_diversidade': self.min_diversidade,
+                'acao': self.acao, 'fracao_reinicio': self.fracao_reinicio, 'max_reinicios': self.max_reinicios}
+
+
+    def reinicia_estado(self) -> None:
+        """Volta ao estado de uma execucao nova (chamado no inicio de fit)."""
+        self.melhor = None
+        self.melhor_media = None
+        self.geracao_melhor = 0
+        self.geracao_media = 0
+        self.reinicios = 0
+        # decisoes tomadas: (geracao, acao, motivo)
+        self.decisoes = []
+
+
+    def atualiza(self, geracao: int, pop: Populacao) -> tuple:
+        """Atualiza o criterio com a populacao de uma geracao.
+
+        Args:
+            geracao (int): Numero da geracao.
+            pop (Populacao): Populacao da geracao, ja avaliada.
+
+        Returns:
+            tuple: (acao, motivo) se a populacao estagnou, senao None.
+        """
+        melhor = int(pop.pontuacao.max())
+        media = float(pop.pontuacao.mean())
+        if self.melhor is None or melhor > self.melhor:
+            self.melhor = melhor
+            self.geracao_melhor = geracao
+        if self.melhor_media is None or media > self.melhor_media + self.tolerancia:
+            self.melhor_media = media
+            self.geracao_media = geracao
+
+        motivo = None
+        sem_melhora = geracao - max(self.geracao_melhor, self.geracao_media)
+        if self.janela > 0 and sem_melhora >= self.janela:
+            motivo = f'{sem_melhora} geracoes sem melhora (melhor {self.melhor}, media {self.melhor_media:.2f})'
+        elif self.min_diversidade > 0:
+            fracao = diversidade(pop.genomas)
+            if fracao < self.min_diversidade:
+                motivo = f'diversidade {fracao:.3f} abaixo de {self.min_diversidade}'
+        if motivo is None:
+            return None
+
+        acao = 'para'
+        if self.acao == 'reinicia' and self.reinicios < self.max_reinicios:
+            acao = 'reinicia'
+            self.reinicios += 1
+            # a janela recomeca depois do reinicio
+            self.geracao_melhor = self.geracao_media = geracao
+        self.decisoes.append((geracao, acao, motivo))
+
+        return acao, motivo
+
+
+    def estado(self) -> dict:
+        """Retorna o estado do criterio, serializavel em json, para salvar junto com a execucao."""
+        return {'melhor': self.melhor, 'melhor_media': self.melhor_media, 'geracao_melhor': self.geracao_melhor,
+                'geracao_media': self.geracao_media, 'reinicios': self.reinicios, 'decisoes': [list(d) for d in self.decisoes]}
+
+
+    def restaura(self, estado: dict) -> None:
+        """Restaura um estado retornado por estado."""
+        for nome, valor in estado.items():
+            setattr(self, nome, valor)
+        self.decisoes = [tuple(d) for d in self.decisoes]
@@ -0,0 +1,137 @@
+from labirinto import Labirinto, LabirintoSet
+from populacao import Populacao, compacta
+from avaliacao import Checkpoint, MOTORES
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import numpy as np
+
+
+# vetores em memoria compartilhada vistos por cada processo trabalhador
+_compartilhado = {}
+
+# resultados da avaliacao que os trabalhadores escrevem, com os mesmos nomes dos vetores de Populacao
+RESULTADOS = ('pontuacao', 'comidas', 'n_corretos', 'corretos', 'posicao', 'pontuacao_corretos', 'visitados')
+
+# checkpoint de onde cada individuo continua a exploracao, com os nomes dos campos de Checkpoint
+CHECKPOINT = ('passo', 'posicao', 'visitados', 'pontuacao', 'comidas')
+
+
+def _inicia_trabalhador(descricao: dict, agregacao: str = None, motor: str = 'lote') -> None:
+    """Abre, em um processo trabalhador, os vetores em memoria compartilhada e monta o labirinto (ou o
+       conjunto de labirintos, se houver agregacao)."""
+    _compartilhado['motor'] = MOTORES[motor]
+    for nome, (nome_memoria, forma, tipo) in descricao.items():
+        memoria = shared_memory.SharedMemory(name=nome_memoria)
+        _compartilhado['_' + nome] = memoria
+        _compartilhado[nome] = np.ndarray(forma, dtype=tipo, buffer=memoria.buf)
+
+    if agregacao is None:
+        _compartilhado['lab'] = Labirinto.de_matriz(_compartilhado['caminho'])
+    else:
+        _compartilhado['lab'] = LabirintoSet.de_matriz(_compartilhado['caminho'], agregacao)
+
+
+def _avalia_bloco(inicio: int, fim: int, retoma: bool) -> None:
+    """Avalia as linhas [inicio, fim) dos genomas compartilhados e escreve o resultado na memoria compartilhada."""
+    genomas = _compartilhado['genomas'][inicio:fim]
+    checkpoint = None
+    if retoma:
+        checkpoint = Checkpoint(*(_compartilhado['ck_' + nome][inicio:fim] for nome in CHECKPOINT))
+    resultado = _compartilhado['motor'](genomas, _compartilhado['lab'], checkpoint)
+
+    for nome in RESULTADOS:
+        if nome == 'corretos':
+            _compartilhado[nome][inicio:fim] = compacta(genomas, resultado.corretos)
+        elif nome == 'visitados':
+            _compartilhado[nome][inicio:fim] = np.packbits(resultado.visitados, axis=1)
+        else:
+            _compartilhado[nome][inicio:fim] = getattr(resultado, nome)
+
+
+class AvaliadorParalelo:
+
+    def __init__(self, lab: Labirinto, n: int, n_genes: int, n_jobs: int, motor: str = 'lote') -> None:
+        """Cria um grupo persistente de processos que avaliam populacoes de n individuos. O labirinto e os
+           genomas ficam em memoria compartilhada, entao nada eh serializado a cada geracao.
+
+        Args:
+            lab (Labirinto | LabirintoSet): Labirinto (ou conjunto de labirintos) onde os individuos sao avaliados.
+            n (int): Quantidade de individuos de cada populacao.
+            n_genes (int): Quantidade de movimentos de cada individuo.
+            n_jobs (int): Quantidade de processos trabalhadores.
+            motor (str, optional): Motor de avaliacao usado pelos trabalhadores (ver avaliacao.MOTORES). Defaults to 'lote'.
+        """
+        self.n = n
+        self.n_jobs = n_jobs
+        self._memorias = []
+        self._vetores = {}
+
+        n_bytes = (lab.n_linhas*lab.n_colunas + 7) // 8
+        formas = {
+            'caminho': (lab.caminho.shape, lab.caminho.dtype),
+            'genomas': ((n, n_genes), np.dtype(np.uint8)),
+            'corretos': ((n, n_genes), np.dtype(np.uint8)),
+            'visitados': ((n, n_bytes), np.dtype(np.uint8)),
+            'ck_visitados': ((n, n_bytes), np.dtype(np.uint8)),
+        }
+        for nome in ('pontuacao', 'comidas', 'n_corretos', 'posicao', 'pontuacao_corretos'):
+            formas[nome] = ((n,), np.dtype(np.int32))
+        for nome in ('passo', 'posicao', 'pontuacao', 'comidas'):
+            formas['ck_' + nome] = ((n,), np.dtype(np.int32))
+        descricao = {}
+        for nome, (forma, tipo) in formas.items():
+            memoria = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(forma))*tipo.itemsize))
+            self._memorias.append(memoria)
+            self._vetores[nome] = np.ndarray(forma, dtype=tipo, buffer=memoria.buf)
+            descricao[nome] = (memoria.name, forma, tipo.str)
+        self._vetores['caminho'][:] = lab.caminho
+
+        # divide as linhas da populacao em um bloco por processo
+        limites = np.linspace(0, n, n_jobs + 1).astype(int)
+        self._blocos = [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:]) if b > a]
+
+        agregacao = lab.agregacao if isinstance(lab, LabirintoSet) else None
+        self._pool = mp.Pool(n_jobs, initializer=_inicia_trabalhador, initargs=(descricao, agregacao, motor))
+
+
+    def avalia(self, pop: Populacao, checkpoint: Checkpoint = None) -> None:
+        """Avalia todos os individuos da populacao nos processos trabalhadores e atualiza o resultado de cada
+           um, igual a Populacao.avalia.
+
+        Args:
+            pop (Populacao): Populacao com n individuos.
+            checkpoint (Checkpoint, optional): Estado de onde cada individuo continua a exploracao. Defaults to None.
+        """
+        if len(pop) != self.n or pop.genomas.shape != self._vetores['genomas'].shape:
+            raise ValueError(f'O avaliador foi criado para populacoes de forma {self._vetores["genomas"].shape}')
+
+        self._vetores['genomas'][:] = pop.genomas
+        if checkpoint is not None:
+            for nome in CHECKPOINT:
+                self._vetores['ck_' + nome][:] = getattr(checkpoint, nome)
+        self._pool.starmap(_avalia_bloco, [(a, b, checkpoint is not None) for a, b in self._blocos])
+
+        if pop.visitados.shape != self._vetores['visitados'].shape:
+            pop.visitados = np.zeros(self._vetores['visitados'].shape, dtype=np.uint8)
+        pop.alteracoes += 1
+        for nome in RESULTADOS:
+            getattr(pop, nome)[:] = self._vetores[nome]
+
+
+    def fecha(self) -> None:
+        """Encerra os processos trabalhadores e libera a memoria compartilhada."""
+        self._pool.close()
+        self._pool.join()
+        self._vetores.clear()
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+        self._memorias = []
+
+
+    def __enter__(self) -> 'AvaliadorParalelo':
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.fecha()
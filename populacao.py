@@ -0,0 +1,151 @@
+from labirinto import Labirinto
+from individuo import Individuo
+from avaliacao import AvaliacaoLote, Checkpoint, MOTORES
+import numpy as np
+
+class Populacao:
+
+    def __init__(self, n: int, n_genes: int) -> None:
+        """Inicializa uma populacao de n individuos guardada em vetores contiguos do numpy.
+
+        Args:
+            n (int): Quantidade de individuos.
+            n_genes (int): Quantidade de movimentos de cada individuo.
+        """
+        self.genomas = np.zeros((n, n_genes), dtype=np.uint8)
+        self.corretos = np.zeros((n, n_genes), dtype=np.uint8)
+        self.n_corretos = np.zeros(n, dtype=np.int32)
+        self.pontuacao = np.zeros(n, dtype=np.int32)
+        self.comidas = np.zeros(n, dtype=np.int32)
+
+        # estado no fim dos movimentos corretos, usado para continuar a avaliacao dos descendentes
+        self.posicao = np.zeros(n, dtype=np.int32)
+        self.pontuacao_corretos = np.zeros(n, dtype=np.int32)
+        self.visitados = np.zeros((n, 0), dtype=np.uint8)
+
+        # conta as alteracoes da avaliacao, para invalidar o que eh calculado a partir das pontuacoes (como o
+        # heap do modo estacionario); quem escreve direto nos vetores deve soma-lo tambem
+        self.alteracoes = 0
+
+
+    @classmethod
+    def de_individuos(cls, individuos: list) -> 'Populacao':
+        """Cria uma populacao a partir de uma lista de individuos com genomas de mesmo tamanho, copiando
+           os movimentos e a pontuacao de cada um."""
+        pop = cls(len(individuos), len(individuos[0].movimentos))
+        for i, ind in enumerate(individuos):
+            pop[i].atribui(ind)
+
+        return pop
+
+
+    @property
+    def n_genes(self) -> int:
+        """Quantidade de movimentos de cada individuo."""
+        return self.genomas.shape[1]
+
+
+    def __len__(self) -> int:
+        return self.genomas.shape[0]
+
+
+    def __getitem__(self, i: int) -> Individuo:
+        """Retorna um Individuo que eh uma visao da linha i da populacao."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Individuo(self, i)
+
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Individuo(self, i)
+
+
+    def avalia(self, lab: Labirinto, checkpoint: Checkpoint = None, motor: str = 'lote') -> None:
+        """Avalia todos os individuos em lote e atualiza a pontuacao, as comidas, os movimentos corretos e
+           o checkpoint de cada um.
+
+        Args:
+            lab (Labirinto): Labirinto onde os movimentos sao executados.
+            checkpoint (Checkpoint, optional): Estado de onde cada individuo continua a exploracao. Defaults to None.
+            motor (str, optional): Motor de avaliacao (ver avaliacao.MOTORES): 'lote' ou 'compacto'. Defaults to 'lote'.
+        """
+        self.guarda(MOTORES[motor](self.genomas, lab, checkpoint))
+
+
+    def guarda(self, resultado: AvaliacaoLote, linhas: slice = slice(None)) -> None:
+        """Guarda nas linhas indicadas o resultado da avaliacao dos genomas delas."""
+        n_bytes = (resultado.visitados.shape[1] + 7) // 8
+        if self.visitados.shape[1] != n_bytes:
+            self.visitados = np.zeros((len(self), n_bytes), dtype=np.uint8)
+
+        self.alteracoes += 1
+        self.pontuacao[linhas] = resultado.pontuacao
+        self.comidas[linhas] = resultado.comidas
+        self.n_corretos[linhas] = resultado.n_corretos
+        self.corretos[linhas] = compacta(self.genomas[linhas], resultado.corretos)
+        self.posicao[linhas] = resultado.posicao
+        self.pontuacao_corretos[linhas] = resultado.pontuacao_corretos
+        self.visitados[linhas] = np.packbits(resultado.visitados, axis=1)
+
+
+    def checkpoint(self, indices: np.ndarray) -> Checkpoint:
+        """Retorna o estado no fim dos movimentos corretos dos individuos indicados, de onde um filho que
+           comeca com esses movimentos continua a exploracao."""
+        return Checkpoint(self.n_corretos[indices], self.posicao[indices], self.visitados[indices],
+                          self.pontuacao_corretos[indices], self.comidas[indices])
+
+
+    def guarda_checkpoint(self, i: int, checkpoint: Checkpoint) -> None:
+        """Guarda na linha i o checkpoint de um unico individuo (por exemplo, vindo de Individuo.explora)."""
+        if self.visitados.shape[1] != checkpoint.visitados.shape[1]:
+            self.visitados = np.zeros((len(self), checkpoint.visitados.shape[1]), dtype=np.uint8)
+
+        self.posicao[i] = checkpoint.posicao[0]
+        self.visitados[i] = checkpoint.visitados[0]
+        self.pontuacao_corretos[i] = checkpoint.pontuacao[0]
+
+
+    def seleciona(self, indices: np.ndarray) -> 'Populacao':
+        """Retorna uma nova populacao com copias dos individuos indicados (genoma e avaliacao)."""
+        pop = Populacao(len(indices), self.n_genes)
+        pop.genomas[:] = self.genomas[indices]
+        pop.copia_avaliacao(np.arange(len(indices)), self, indices)
+
+        return pop
+
+
+    def substitui(self, destino: np.ndarray, outra: 'Populacao') -> None:
+        """Coloca os individuos de outra populacao (genoma e avaliacao) nas linhas indicadas."""
+        self.genomas[destino] = outra.genomas
+        self.copia_avaliacao(destino, outra, np.arange(len(outra)))
+
+
+    def copia_avaliacao(self, destino: np.ndarray, origem: 'Populacao', indices: np.ndarray) -> None:
+        """Copia o resultado da avaliacao de individuos de outra populacao com o mesmo genoma."""
+        if self.visitados.shape != (len(self), origem.visitados.shape[1]):
+            self.visitados = np.zeros((len(self), origem.visitados.shape[1]), dtype=np.uint8)
+
+        self.alteracoes += 1
+        for nome in ('pontuacao', 'comidas', 'n_corretos', 'corretos', 'posicao', 'pontuacao_corretos', 'visitados'):
+            getattr(self, nome)[destino] = getattr(origem, nome)[indices]
+
+
+def compacta(genomas: np.ndarray, mascara: np.ndarray) -> np.ndarray:
+    """Junta, no inicio de cada linha, os movimentos marcados na mascara, mantendo a ordem.
+
+    Args:
+        genomas (np.ndarray): Matriz (n, genoma) de movimentos.
+        mascara (np.ndarray): Matriz booleana (n, genoma) com os movimentos que devem ser mantidos.
+
+    Returns:
+        np.ndarray: Matriz (n, genoma) com os movimentos mantidos no inicio de cada linha e zeros no resto.
+    """
+    saida = np.zeros_like(genomas)
+    linhas, colunas = np.nonzero(mascara)
+    destino = np.cumsum(mascara, axis=1, dtype=np.int32)[linhas, colunas] - 1
+    saida[linhas, destino] = genomas[linhas, colunas]
+
+    return saida
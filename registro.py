@@ -0,0 +1,217 @@
+from populacao import Populacao
+import numpy as np
+import os
+
+# tamanho do buffer dos arquivos de registro (1 MB)
+BUFFER = 1 << 20
+
+# cabecalho e formato de cada registro do arquivo binario
+ASSINATURA = b'AGREG01\n'
+REGISTRO = np.dtype([('geracao', '<i4'), ('indice', '<i4'), ('pontuacao', '<i4'), ('comidas', '<i4')])
+
+
+def formata_geracao(geracao: int, pontuacao: np.ndarray, comidas: np.ndarray) -> str:
+    """Monta o texto de uma geracao no formato do relatorio (saida.txt)."""
+    partes = [f'Geracao {geracao}\n']
+    separador = '-'*50 + ' \n'
+    for i, (p, c) in enumerate(zip(np.asarray(pontuacao).tolist(), np.asarray(comidas).tolist())):
+        partes.append(f'Individuo {i} \nPontuacao: {p} \nQuantidade de Comidas: {c} \n{separador}')
+    partes.append('\n\n\n\n\n')
+
+    return ''.join(partes)
+
+
+class Registro:
+    """Destino do registro da execucao do algoritmo genetico. As subclasses decidem o que guardar de cada
+       geracao; mensagens (solucao, convergencia) sao sempre texto."""
+
+    def __init__(self, arquivo: str) -> None:
+        """Inicializa o registro. O arquivo so eh aberto (e apagado) em inicia.
+
+        Args:
+            arquivo (str): Nome do arquivo de registro.
+        """
+        self.arquivo = arquivo
+        self._f = None
+
+
+    def inicia(self, marca: list = None) -> None:
+        """Abre o arquivo de registro, apagando o conteudo anterior.
+
+        Args:
+            marca (list, optional): Se informada (ver marca), continua o registro a partir dela, descartando o que
+                foi escrito depois. Usado ao retomar uma execucao. Defaults to None.
+        """
+        self.fecha()
+        self._f = self._abre(self.arquivo, 'w', marca, 0)
+
+
+    def marca(self) -> list:
+        """Descarrega o buffer e retorna o tamanho atual de cada arquivo do registro, de onde inicia pode
+           continuar o registro."""
+        self._f.flush()
+        return [os.path.getsize(self.arquivo)]
+
+
+    @staticmethod
+    def _abre(arquivo: str, modo: str, marca: list, i: int):
+        """Abre um arquivo do registro do inicio ou, se houver marca, a partir do tamanho marcado para ele."""
+        if marca is None:
+            return open(arquivo, modo, buffering=BUFFER)
+
+        os.truncate(arquivo, marca[i])
+        return open(arquivo, modo.replace('w', 'a'), buffering=BUFFER)
+
+
+    def escreve_geracao(self, geracao: int, pop: Populacao) -> None:
+        """Registra uma geracao."""
+        raise NotImplementedError
+
+
+    def escreve(self, texto: str) -> None:
+        """Registra uma mensagem de texto."""
+        self._f.write(texto)
+
+
+    def fecha(self) -> None:
+        """Descarrega o buffer e fecha o arquivo."""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class RegistroNulo(Registro):
+    """Nao guarda nada. Usado quando so interessa o resultado da execucao (por exemplo, na busca de parametros)."""
+
+    def __init__(self) -> None:
+        super().__init__(None)
+
+
+    def inicia(self, marca: list = None) -> None:
+        pass
+
+
+    def marca(self) -> list:
+        return []
+
+
+    def escreve_geracao(self, geracao: int, pop: Populacao) -> None:
+        pass
+
+
+    def escreve(self, texto: str) -> None:
+        pass
+
+
+class RegistroTexto(Registro):
+    """Escreve o relatorio completo em texto, como o saida.txt, mantendo o arquivo aberto durante toda a execucao."""
+
+    def escreve_geracao(self, geracao: int, pop: Populacao) -> None:
+        self._f.write(formata_geracao(geracao, pop.pontuacao, pop.comidas))
+
+
+class RegistroResumo(Registro):
+    """Escreve so um resumo de cada geracao em csv: pontuacao minima, media e maxima e o maximo de comidas.
+       As mensagens sao escritas em um arquivo de texto ao lado (arquivo + '.txt')."""
+
+    def inicia(self, marca: list = None) -> None:
+        self.fecha()
+        self._f = self._abre(self.arquivo, 'w', marca, 0)
+        self._mensagens = self._abre(self.arquivo + '.txt', 'w', marca, 1)
+        if marca is None:
+            self._f.write('geracao,min,media,max,melhor_comidas\n')
+
+
+    def marca(self) -> list:
+        self._mensagens.flush()
+        return super().marca() + [os.path.getsize(self.arquivo + '.txt')]
+
+
+    def escreve_geracao(self, geracao: int, pop: Populacao) -> None:
+        self._f.write(f'{geracao},{pop.pontuacao.min()},{pop.pontuacao.mean():.4f},{pop.pontuacao.max()},{pop.comidas.max()}\n')
+
+
+    def escreve(self, texto: str) -> None:
+        self._mensagens.write(texto)
+
+
+    def fecha(self) -> None:
+        if self._f is not None:
+            self._mensagens.close()
+        super().fecha()
+
+
+class RegistroBinario(Registro):
+    """Guarda geracao, indice, pontuacao e comidas de cada individuo em registros binarios de tamanho fixo,
+       so acrescentados ao fim do arquivo. As mensagens vao para um arquivo de texto ao lado (arquivo + '.txt').
+       O relatorio em texto pode ser refeito com reconstroi_texto."""
+
+    def inicia(self, marca: list = None) -> None:
+        self.fecha()
+        self._f = self._abre(self.arquivo, 'wb', marca, 0)
+        self._mensagens = self._abre(self.arquivo + '.txt', 'w', marca, 1)
+        if marca is None:
+            self._f.write(ASSINATURA)
+
+
+    def marca(self) -> list:
+        self._mensagens.flush()
+        return super().marca() + [os.path.getsize(self.arquivo + '.txt')]
+
+
+    def escreve_geracao(self, geracao: int, pop: Populacao) -> None:
+        registros = np.empty(len(pop), dtype=REGISTRO)
+        registros['geracao'] = geracao
+        registros['indice'] = np.arange(len(pop))
+        registros['pontuacao'] = pop.pontuacao
+        registros['comidas'] = pop.comidas
+        self._f.write(registros.tobytes())
+
+
+    def escreve(self, texto: str) -> None:
+        self._mensagens.write(texto)
+
+
+    def fecha(self) -> None:
+        if self._f is not None:
+            self._mensagens.close()
+        super().fecha()
+
+
+def le_registro_binario(arquivo: str) -> np.ndarray:
+    """Le todos os registros de um arquivo escrito por RegistroBinario (sem copiar para a memoria)."""
+    with open(arquivo, 'rb') as f:
+        if f.read(len(ASSINATURA)) != ASSINATURA:
+            raise ValueError(f'{arquivo} nao eh um registro binario do algoritmo genetico')
+
+    return np.memmap(arquivo, dtype=REGISTRO, mode='r', offset=len(ASSINATURA))
+
+
+def reconstroi_texto(arquivo: str, saida: str = None) -> str:
+    """Refaz o relatorio em texto (formato do saida.txt) a partir de um registro binario.
+
+    Args:
+        arquivo (str): Arquivo escrito por RegistroBinario.
+        saida (str, optional): Se informado, escreve o relatorio nesse arquivo. Defaults to None.
+
+    Returns:
+        str: O relatorio em texto.
+    """
+    registros = le_registro_binario(arquivo)
+
+    # cada geracao eh um bloco continuo de registros
+    partes = []
+    inicios = np.flatnonzero(np.diff(registros['geracao'], prepend=np.int32(-1)) != 0) if len(registros) else []
+    for inicio, fim in zip(inicios, list(inicios[1:]) + [len(registros)]):
+        bloco = registros[inicio:fim]
+        partes.append(formata_geracao(int(bloco['geracao'][0]), bloco['pontuacao'], bloco['comidas']))
+
+    with open(arquivo + '.txt') as f:
+        partes.append(f.read())
+    texto = ''.join(partes)
+
+    if saida is not None:
+        with open(saida, 'w') as f:
+            f.write(texto)
+
+    return texto
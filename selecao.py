@@ -0,0 +1,107 @@
+import numpy as np
+
+# metodos de selecao dos pais em AlgoritmoGenetico
+SELECOES = ('torneio', 'ranking', 'sus')
+
+
+def _menores(chave: np.ndarray, k: int) -> np.ndarray:
+    """Retorna os indices dos k menores valores de chave na ordem de np.argsort(chave, kind='stable')[:k]
+       (empates pela ordem original), sem ordenar o vetor todo: uma selecao parcial acha o k-esimo valor e so
+       os k escolhidos sao ordenados."""
+    n = len(chave)
+    if k >= n:
+        return np.argsort(chave, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    limite = np.partition(chave, k - 1)[k - 1]
+    menores = np.flatnonzero(chave < limite)
+    iguais = np.flatnonzero(chave == limite)[:k - len(menores)]
+    escolhidos = np.concatenate([menores, iguais])
+
+    return escolhidos[np.argsort(chave[escolhidos], kind='stable')]
+
+
+def k_melhores(pontuacao: np.ndarray, n: int) -> np.ndarray:
+    """Retorna os indices dos n individuos de maior pontuacao, do melhor para o pior (empates pela ordem na
+       populacao)."""
+    return _menores(-pontuacao.astype(np.int64), n)
+
+
+def k_piores(pontuacao: np.ndarray, n: int) -> np.ndarray:
+    """Retorna os indices dos n individuos de menor pontuacao, do pior para o melhor (empates pela ordem na
+       populacao)."""
+    return _menores(pontuacao, n)
+
+
+def torneio(pontuacao: np.ndarray, rng: np.random.Generator, n: int, tamanho: int = 2) -> np.ndarray:
+    """Faz n torneios de uma vez: sorteia os participantes de todos eles (com reposicao) e retorna, para cada
+       torneio, o indice do participante de maior pontuacao (nos empates, o ultimo sorteado).
+
+    Args:
+        pontuacao (np.ndarray): Pontuacao de cada individuo.
+        rng (np.random.Generator): Gerador aleatorio.
+        n (int): Quantidade de torneios.
+        tamanho (int, optional): Quantidade de participantes de cada torneio. Defaults to 2.
+
+    Returns:
+        np.ndarray: Indice do vencedor de cada torneio.
+    """
+    participantes = rng.integers(0, len(pontuacao), (n, tamanho))
+
+    # o argmax dos participantes de tras para frente da o ultimo empatado
+    vencedor = tamanho - 1 - pontuacao[participantes[:, ::-1]].argmax(axis=1)
+    return participantes[np.arange(n), vencedor]
+
+
+def pesos_ranking(pontuacao: np.ndarray, pressao: float = 1.5) -> np.ndarray:
+    """Probabilidade de selecao de cada individuo pelo ranking linear: depende so da posicao na ordem das
+       pontuacoes, de (2 - pressao)/n para o pior ate pressao/n para o melhor.
+
+    Args:
+        pontuacao (np.ndarray): Pontuacao de cada individuo.
+        pressao (float, optional): Pressao seletiva, entre 1 (uniforme) e 2. Defaults to 1.5.
+
+    Returns:
+        np.ndarray: Probabilidades (somam 1).
+    """
+    n = len(pontuacao)
+    if n == 1:
+        return np.ones(1)
+    posicao = np.empty(n)
+    posicao[np.argsort(pontuacao, kind='stable')] = np.arange(n)
+
+    return ((2 - pressao) + 2*(pressao - 1)*posicao/(n - 1)) / n
+
+
+def pesos_aptidao(pontuacao: np.ndarray) -> np.ndarray:
+    """Probabilidade de selecao proporcional a pontuacao, deslocada para que a pior pontuacao tenha peso 1
+       (as pontuacoes podem ser negativas)."""
+    pesos = pontuacao.astype(np.float64) - pontuacao.min() + 1
+
+    return pesos / pesos.sum()
+
+
+def sus(pesos: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    """Amostragem universal estocastica: n ponteiros igualmente espacados, com um unico sorteio de inicio, sobre
+       a soma acumulada dos pesos. Cada individuo eh escolhido floor ou ceil de n*peso vezes. Os indices sao
+       embaralhados para que pares consecutivos formem casais aleatorios.
+
+    Args:
+        pesos (np.ndarray): Probabilidade de selecao de cada individuo (soma 1).
+        rng (np.random.Generator): Gerador aleatorio.
+        n (int): Quantidade de individuos selecionados.
+
+    Returns:
+        np.ndarray: Indices dos selecionados.
+    """
+    acumulado = np.cumsum(pesos)
+    ponteiros = (rng.random() + np.arange(n)) / n * acumulado[-1]
+    escolhidos = np.minimum(np.searchsorted(acumulado, ponteiros, side='right'), len(pesos) - 1)
+
+    return rng.permutation(escolhidos)
+
+
+def ranking(pontuacao: np.ndarray, rng: np.random.Generator, n: int, pressao: float = 1.5) -> np.ndarray:
+    """Seleciona n individuos pelo ranking linear (ver pesos_ranking), com amostragem universal estocastica."""
+    return sus(pesos_ranking(pontuacao, pressao), rng, n)
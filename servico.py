@@ -0,0 +1,184 @@
+from labirinto import Labirinto
+from ag import AlgoritmoGenetico
+from registro import Registro, RegistroNulo
+from observador import Observador, Metricas
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import itertools
+import asyncio
+import time
+
+# marca o fim do progresso de um job na fila
+_FIM = object()
+
+
+class Cancelado(Exception):
+    """Interrompe o fit de um job cancelado (levantada entre duas geracoes)."""
+
+
+class ResultadoJob:
+
+    def __init__(self, id: int, ag: AlgoritmoGenetico, tempo_total: float, cancelado: bool) -> None:
+        """Resultado estruturado de um job.
+
+        Args:
+            id (int): Identificador do job.
+            ag (AlgoritmoGenetico): Algoritmo genetico que executou o job.
+            tempo_total (float): Tempo (s) entre o inicio e o fim do fit.
+            cancelado (bool): Se o job foi cancelado antes de terminar.
+        """
+        self.id = id
+        self.cancelado = cancelado
+        self.resolveu = ag.solucao is not None
+        self.movimentos = [int(m) for m in ag.solucao.movimentos] if self.resolveu else None
+        self.movimentos_corretos = [int(m) for m in ag.solucao.movimentos_corretos] if self.resolveu else None
+        self.comidas = int(ag.solucao.comidas) if self.resolveu else None
+        self.geracoes = ag.geracoes
+        self.avaliacoes = ag.avaliacoes
+        self.motivo_parada = ag.motivo_parada
+        self.tempos = dict(ag.tempos)
+        self.tempo_total = tempo_total
+        self.cache = ag.estatisticas_cache()
+        self.amostragem = ag.amostrador.estatisticas()
+
+
+    def como_dict(self) -> dict:
+        """Retorna o resultado em um dicionario serializavel em json."""
+        return dict(vars(self))
+
+
+class _ObservadorJob(Observador):
+    """Manda as metricas de cada geracao para a fila do job, no loop do asyncio, e interrompe o fit quando o
+       job eh cancelado."""
+
+    def __init__(self, job: 'Job') -> None:
+        self.job = job
+
+
+    def geracao(self, metricas: Metricas) -> None:
+        if self.job._cancelar.is_set():
+            raise Cancelado()
+        self.job._publica(metricas.como_dict())
+
+
+class Job:
+
+    def __init__(self, id: int, loop: asyncio.AbstractEventLoop) -> None:
+        """Job submetido a um ServicoAG. O progresso eh lido com `async for metricas in job` (um dicionario de
+           Metricas.como_dict por geracao) e o resultado com `await job.resultado()`."""
+        self.id = id
+        self._loop = loop
+        self._fila = asyncio.Queue()
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+
+    def _publica(self, item) -> None:
+        """Coloca um item na fila do progresso a partir da thread que executa o job."""
+        self._loop.call_soon_threadsafe(self._fila.put_nowait, item)
+
+
+    def cancela(self) -> None:
+        """Pede o cancelamento do job: se ainda nao comecou, nem comeca; se esta executando, para no fim da
+           geracao atual. O resultado fica com cancelado = True."""
+        self._cancelar.set()
+
+
+    def terminou(self) -> bool:
+        return self._futuro is not None and self._futuro.done()
+
+
+    async def resultado(self) -> ResultadoJob:
+        """Espera o job terminar e retorna o resultado (ou levanta o erro do fit)."""
+        return await self._futuro
+
+
+    def __aiter__(self):
+        return self._progresso()
+
+
+    async def _progresso(self):
+        while True:
+            item = await self._fila.get()
+            if item is _FIM:
+                return
+            yield item
+
+
+class ServicoAG:
+
+    def __init__(self, max_jobs: int = 4) -> None:
+        """Inicializa o servico que executa varios fits de AlgoritmoGenetico no mesmo processo, no maximo
+           max_jobs ao mesmo tempo (os outros esperam na fila). Deve ser usado dentro de um loop do asyncio.
+
+        Args:
+            max_jobs (int, optional): Quantidade de jobs executados ao mesmo tempo (threads). Defaults to 4.
+        """
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_jobs, thread_name_prefix='ag')
+        self._ids = itertools.count()
+        self.jobs = {}
+
+
+    def submete(self, lab: Labirinto, parametros: dict = None, registro: Registro = None) -> Job:
+        """Submete um job.
+
+        Args:
+            lab (Labirinto | LabirintoSet): Labirinto do job. Nao eh alterado, entao pode ser usado por varios jobs.
+            parametros (dict, optional): Parametros de AlgoritmoGenetico. Defaults to None.
+            registro (Registro, optional): Registro proprio do job. Defaults to RegistroNulo() (o resultado volta em ResultadoJob).
+
+        Returns:
+            Job: O job, para acompanhar o progresso, cancelar e pegar o resultado.
+        """
+        parametros = dict(parametros or {})
+        if 'registro' in parametros:
+            raise ValueError('O registro do job eh passado em registro, nao nos parametros')
+
+        loop = asyncio.get_running_loop()
+        job = Job(next(self._ids), loop)
+        registro = registro if registro is not None else RegistroNulo()
+        job._futuro = loop.run_in_executor(self._executor, _executa_job, job, lab, parametros, registro)
+        self.jobs[job.id] = job
+
+        return job
+
+
+    async def executa(self, lab: Labirinto, parametros: dict = None, registro: Registro = None) -> ResultadoJob:
+        """Submete um job e espera o resultado."""
+        return await self.submete(lab, parametros, registro).resultado()
+
+
+    def fecha(self, cancela: bool = False) -> None:
+        """Espera os jobs terminarem (ou os cancela) e encerra as threads do servico."""
+        if cancela:
+            for job in self.jobs.values():
+                job.cancela()
+        self._executor.shutdown(wait=True)
+
+
+    async def __aenter__(self) -> 'ServicoAG':
+        return self
+
+
+    async def __aexit__(self, *args) -> None:
+        # espera os jobs sem bloquear o loop
+        await asyncio.get_running_loop().run_in_executor(None, self.fecha)
+
+
+def _executa_job(job: Job, lab: Labirinto, parametros: dict, registro: Registro) -> ResultadoJob:
+    """Executa o fit de um job em uma thread do servico."""
+    observadores = list(parametros.pop('observadores', [])) + [_ObservadorJob(job)]
+    ag = AlgoritmoGenetico(**parametros, registro=registro, observadores=observadores)
+
+    inicio = time.perf_counter()
+    cancelado = job._cancelar.is_set()
+    try:
+        if not cancelado:
+            ag.fit(lab)
+    except Cancelado:
+        cancelado = True
+    finally:
+        job._publica(_FIM)
+
+    return ResultadoJob(job.id, ag, time.perf_counter() - inicio, cancelado)